@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""Discovery, token acquisition, refresh, plugin & per-request costs, measured
+against :class:`requests_oidc.testing.FakeIdP` on localhost::
+
+    python benchmarks/bench_idp.py
+    python benchmarks/bench_idp.py --only refresh --threads 64 --latency 0.05
+
+``--latency`` is added to every IdP response, to stand in for a real network.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import webbrowser
+from pathlib import Path
+from typing import Callable, List
+
+import requests
+from requests_oauthlib import OAuth2Session  # type: ignore
+
+from requests_oidc import (
+    make_auth_code_session,
+    make_client_credentials_session,
+    make_device_code_session,
+    make_token_session,
+)
+from requests_oidc.plugins import (
+    LockingPathPlugin,
+    PathPlugin,
+    SharedMemoryPlugin,
+    SQLiteTokenStore,
+    WriteBehindPlugin,
+)
+from requests_oidc.pool import SessionPool
+from requests_oidc.session import OIDCSession
+from requests_oidc.testing import FakeIdP
+from requests_oidc.utils import DiscoveryCache, DPoP, make_http_session
+from requests_oidc.utils.dpop import ALGORITHMS
+
+
+def report(name: str, samples: List[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<44} {statistics.mean(samples) * 1e6:10.1f} us mean"
+        f" {statistics.median(samples) * 1e6:10.1f} us p50 {p99 * 1e6:10.1f} us p99"
+    )
+
+
+def measure(name: str, fn: Callable[[], object], repeat: int) -> None:
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    report(name, samples)
+
+
+def fetch_token(idp: FakeIdP) -> dict:
+    res = requests.post(
+        f"{idp.url}/token",
+        data={"grant_type": "client_credentials", "client_id": "client", "client_secret": "secret"},
+    )
+    res.raise_for_status()
+    token = res.json()
+    token["expires_at"] = time.time() + token["expires_in"]
+    return token
+
+
+def bench_discovery(idp: FakeIdP, args: argparse.Namespace) -> None:
+    # A new connection & no cache, like a fresh process
+    measure("discovery: cold", lambda: make_http_session().get(idp.oidc_url).json(), args.repeat)
+
+    http = make_http_session()
+    idp.discovery_max_age = 0
+    cache = DiscoveryCache()
+    measure("discovery: revalidated (304)", lambda: cache.fetch(idp.oidc_url, http), args.repeat)
+
+    idp.discovery_max_age = 3600
+    cache = DiscoveryCache()
+    measure("discovery: cached", lambda: cache.fetch(idp.oidc_url, http), args.repeat)
+
+
+def bench_flows(idp: FakeIdP, args: argparse.Namespace) -> None:
+    webbrowser.open = lambda url: True  # type: ignore
+    cache = DiscoveryCache()
+
+    measure(
+        "acquire: client_credentials",
+        lambda: make_client_credentials_session(
+            idp.oidc_url, "client", "secret", discovery_cache=cache
+        ).warm_up(),
+        args.repeat,
+    )
+    def device_code() -> None:
+        # Keep the QR codes off the terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_device_code_session(idp.oidc_url, "client", "api", discovery_cache=cache)
+
+    measure("acquire: device_code", device_code, args.repeat)
+
+    def browse(url: str) -> bool:
+        # Play the browser, following the IdP's redirect back to the catcher
+        threading.Thread(target=requests.get, args=(url,), daemon=True).start()
+        return True
+
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+    webbrowser.open = browse  # type: ignore
+    measure(
+        "acquire: auth_code",
+        lambda: make_auth_code_session(idp.oidc_url, "client", port, discovery_cache=cache),
+        args.repeat,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plugin = PathPlugin(Path(tmp) / "token.json")
+        plugin.update(fetch_token(idp))
+        measure(
+            "acquire: token (from plugin)",
+            lambda: make_token_session(idp.oidc_url, "client", plugin=plugin, discovery_cache=cache),
+            args.repeat,
+        )
+
+
+def bench_refresh(idp: FakeIdP, args: argparse.Namespace) -> None:
+    # Compares coalesced refreshes w/ plain requests_oauthlib, so don't rotate
+    # refresh tokens, or plain sessions would fail rather than be slow
+    idp.rotate_refresh_tokens = False
+
+    for klass in (OAuth2Session, OIDCSession):
+        token = dict(fetch_token(idp), expires_at=time.time() - 1)
+        session = klass(
+            client_id="client",
+            auto_refresh_url=f"{idp.url}/token",
+            token=token,
+            token_updater=lambda token: None,
+        )
+        before = idp.hits["token"]
+        barrier = threading.Barrier(args.threads)
+
+        def call() -> None:
+            barrier.wait()
+            session.get(idp.api_url).raise_for_status()
+
+        threads = [threading.Thread(target=call) for _ in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        name = f"refresh: {klass.__name__} x{args.threads} threads"
+        print(f"{name:<44} {elapsed * 1e3:10.1f} ms total {idp.hits['token'] - before:6} token requests")
+
+
+def bench_plugins(idp: FakeIdP, args: argparse.Namespace) -> None:
+    token = fetch_token(idp)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTokenStore(Path(tmp) / "tokens.db")
+        shm = SharedMemoryPlugin()
+        write_behind = WriteBehindPlugin(PathPlugin(Path(tmp) / "write-behind.json"))
+        plugins = {
+            "PathPlugin": PathPlugin(Path(tmp) / "path.json"),
+            "WriteBehindPlugin(PathPlugin)": write_behind,
+            "LockingPathPlugin": LockingPathPlugin(Path(tmp) / "locking.json"),
+            "SQLitePlugin": store.plugin(idp.url, "client"),
+            "SharedMemoryPlugin": shm,
+        }
+        try:
+            for name, plugin in plugins.items():
+                # Every update is a new token, as it would be after a refresh
+                measure(
+                    f"plugin: {name}.update",
+                    lambda: plugin.update(dict(token, access_token=str(time.perf_counter()))),
+                    args.repeat,
+                )
+                measure(f"plugin: {name}.load", plugin.load, args.repeat)
+        finally:
+            write_behind.close()
+            shm.close()
+
+
+class _NullAdapter(requests.adapters.BaseAdapter):
+    def send(self, request, **kwargs):
+        res = requests.Response()
+        res.status_code = 200
+        res.request = request
+        res.url = request.url
+        return res
+
+    def close(self):
+        pass
+
+
+def bench_overhead(idp: FakeIdP, args: argparse.Namespace) -> None:
+    token = fetch_token(idp)
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    plain = requests.Session()
+    measure("request: requests.Session", lambda: plain.get(idp.api_url, headers=headers), args.repeat)
+
+    session = make_client_credentials_session(idp.oidc_url, "client", "secret", discovery_cache=None)
+    measure("request: OIDCSession", lambda: session.get(idp.api_url), args.repeat)
+    fast = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", discovery_cache=None, fast=True
+    )
+    measure("request: OIDCSession(fast=True)", lambda: fast.get(idp.api_url), args.repeat)
+
+    # W/o the network or env / netrc lookups, to see the auth path itself
+    for name, timed in (("OIDCSession", session), ("OIDCSession(fast=True)", fast)):
+        timed.warm_up()
+        timed.trust_env = False
+        timed.mount(idp.api_url, _NullAdapter())
+        measure(f"request, no I/O: {name}", lambda: timed.get(idp.api_url), args.repeat * 10)
+
+    for algorithm in ALGORITHMS:
+        dpop = DPoP(algorithm=algorithm)
+        session = make_client_credentials_session(
+            idp.oidc_url, "client", "secret", dpop=dpop, discovery_cache=None
+        )
+        measure(f"request: OIDCSession w/ DPoP {algorithm}", lambda: session.get(idp.api_url), args.repeat)
+        measure(f"DPoP {algorithm} proof", lambda: dpop.proof("GET", idp.api_url, "token"), args.repeat)
+
+
+def bench_pool(idp: FakeIdP, args: argparse.Namespace) -> None:
+    factory = functools.partial(
+        make_client_credentials_session, idp.oidc_url, "client", "secret", discovery_cache=None
+    )
+    shared = factory(http=make_http_session(pool_maxsize=args.threads))
+    pool = SessionPool(factory, workers=args.threads)
+    per_thread = max(1, args.repeat // 10)
+
+    for name, get in (
+        ("one shared OIDCSession", lambda: shared),
+        ("SessionPool", pool.session),
+    ):
+        barrier = threading.Barrier(args.threads)
+
+        def call() -> None:
+            session = get()
+            barrier.wait()
+            for _ in range(per_thread):
+                session.get(idp.api_url).raise_for_status()
+
+        threads = [threading.Thread(target=call) for _ in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        total = args.threads * per_thread
+        name = f"pool: {name} x{args.threads} threads"
+        print(f"{name:<44} {elapsed * 1e3:10.1f} ms total {elapsed / total * 1e6:10.1f} us/request")
+    pool.close()
+
+
+SECTIONS = {
+    "discovery": bench_discovery,
+    "flows": bench_flows,
+    "refresh": bench_refresh,
+    "plugins": bench_plugins,
+    "overhead": bench_overhead,
+    "pool": bench_pool,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", action="append", choices=list(SECTIONS))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    for section in args.only or SECTIONS:
+        with FakeIdP(latency=args.latency) as idp:
+            SECTIONS[section](idp, args)
+
+
+if __name__ == "__main__":
+    main()
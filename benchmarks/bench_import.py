@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Cold-start cost of the package's entry points.
+
+Each statement runs in a fresh interpreter, best of ``--repeat`` runs, w/ the
+bare interpreter's startup subtracted out::
+
+    python benchmarks/bench_import.py
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    "import requests_oidc",
+    "from requests_oidc import make_token_session",
+    "from requests_oidc import make_client_credentials_session",
+    "from requests_oidc import make_device_code_session",
+    "from requests_oidc import make_auth_code_session",
+    "from requests_oidc.plugins import PathPlugin",
+    "import requests_oidc.cli",
+]
+
+
+def cold_start(statement: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = cold_start("pass", args.repeat)
+    print(f"{'interpreter':<60} {baseline * 1000:8.1f} ms")
+    for statement in STATEMENTS:
+        cost = cold_start(statement, args.repeat) - baseline
+        print(f"{statement:<60} {cost * 1000:+8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,39 @@
+import importlib
 import os
-
-from .flows.auth_code import make_auth_code_session
-from .flows.client_credentials import make_client_credentials_session
-from .flows.device_code import make_device_code_session
-from .flows.token import make_token_session
+from typing import TYPE_CHECKING, Any, List
 
 # BS to work around oauthlib's wonkyness, they don't make this configurable w/o envvars
 os.environ.setdefault("OAUTHLIB_INSECURE_TRANSPORT", "True")
 os.environ.setdefault("OAUTHLIB_RELAX_TOKEN_SCOPE", "True")
+
+# Flows are imported on first use, so a process that only wants one of them
+# doesn't pay for the others' dependencies (qrcode, webbrowser, http.server...)
+_LAZY = {
+    "make_auth_code_session": ".flows.auth_code",
+    "make_client_credentials_session": ".flows.client_credentials",
+    "make_device_code_session": ".flows.device_code",
+    "make_token_session": ".flows.token",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .flows.auth_code import make_auth_code_session
+    from .flows.client_credentials import make_client_credentials_session
+    from .flows.device_code import make_device_code_session
+    from .flows.token import make_token_session
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,14 @@
+"""``asyncio`` counterparts of the session factories, built on ``httpx``.
+
+DPoP isn't supported yet, use the sync factories for sender-constrained tokens.
+
+Requires the ``async`` extra: ``pip install requests-oidc[async]``.
+"""
+
+from .auth import AsyncOIDCAuth
+from .flows import (
+    make_async_auth_code_session,
+    make_async_client_credentials_session,
+    make_async_device_code_session,
+    make_async_token_session,
+)
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+import httpx
+from oauthlib.oauth2 import Client
+
+from ..instrumentation import event, span
+from ..types import Plugin
+
+
+async def aload(plugin: Optional[Plugin]) -> Optional[dict]:
+    """``plugin.aload()`` if it has one, otherwise ``plugin.load()`` on a worker thread."""
+    if plugin is None:
+        return None
+    with span("plugin.load", plugin=type(plugin).__name__):
+        if hasattr(plugin, "aload"):
+            return await plugin.aload()  # type: ignore
+        return await asyncio.get_running_loop().run_in_executor(None, plugin.load)
+
+
+async def aupdate(plugin: Optional[Plugin], token: dict) -> None:
+    """``plugin.aupdate()`` if it has one, otherwise ``plugin.update()`` on a worker thread."""
+    if plugin is None:
+        return
+    with span("plugin.update", plugin=type(plugin).__name__):
+        if hasattr(plugin, "aupdate"):
+            await plugin.aupdate(token)  # type: ignore
+            return
+        await asyncio.get_running_loop().run_in_executor(None, plugin.update, token)
+
+
+class AsyncOIDCAuth(httpx.Auth):
+    """``httpx`` auth that injects an access token, refreshing it when it expires.
+
+    Refreshes are single-flight: tasks that find the token expired while another
+    task is already refreshing it wait for that refresh, rather than starting
+    their own. ``coalesced`` counts how often that happened.
+
+    :param client: ``oauthlib`` client used to build / parse token requests.
+    :param token_url: The IdP's token endpoint.
+    :param token: Current token, if there is one yet.
+    :param refresh_body: Builds the urlencoded body of a refresh request from the
+      current token. Defaults to a ``refresh_token`` grant.
+    :param refresh_kwargs: Extra parameters for the default refresh grant.
+    :param plugin: Plugin to store refreshed tokens w/.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        token_url: str,
+        token: Optional[dict] = None,
+        *,
+        scope: Optional[List[str]] = None,
+        refresh_body: Optional[Callable[[dict], str]] = None,
+        refresh_kwargs: Optional[Dict[str, Any]] = None,
+        plugin: Optional[Plugin] = None,
+    ) -> None:
+        self.client = client
+        self.token_url = token_url
+        self.token = token or {}
+        self.scope = scope
+        self.refresh_body = refresh_body or self._refresh_token_body
+        self.refresh_kwargs = refresh_kwargs or {}
+        self.plugin = plugin
+        self.refreshes = 0
+        self.coalesced = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refresh_token_body(self, token: dict) -> str:
+        return self.client.prepare_refresh_body(
+            refresh_token=token.get("refresh_token"), scope=self.scope, **self.refresh_kwargs
+        )
+
+    def expired(self) -> bool:
+        expires_at = self.token.get("expires_at")
+        return not self.token or (expires_at is not None and time.time() >= expires_at)
+
+    def _refresh_request(self) -> httpx.Request:
+        return httpx.Request(
+            "POST",
+            self.token_url,
+            content=self.refresh_body(self.token),
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+
+    async def _accept(self, response: httpx.Response) -> dict:
+        response.raise_for_status()
+        old = self.token
+        token = dict(self.client.parse_request_body_response(response.text, scope=self.scope))
+        if "refresh_token" not in token and "refresh_token" in old:
+            token["refresh_token"] = old["refresh_token"]
+
+        self.token = token
+        self.refreshes += 1
+        await aupdate(self.plugin, token)
+        return token
+
+    async def refresh(self, client: httpx.AsyncClient) -> dict:
+        """Fetch a new token right away, through ``client``."""
+        async with self._get_lock():
+            with span("token.refresh", url=self.token_url):
+                response = await client.send(self._refresh_request(), auth=None)
+                response.raise_for_status()
+            return await self._accept(response)
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Created lazily, so it binds to the loop that's actually running
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def sync_auth_flow(self, request):
+        raise RuntimeError("AsyncOIDCAuth only works w/ httpx.AsyncClient")
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        if self.expired():
+            seen = self.token
+            async with self._get_lock():
+                if self.token is seen:
+                    with span("token.refresh", url=self.token_url):
+                        response = yield self._refresh_request()
+                        await response.aread()
+                        response.raise_for_status()
+                    await self._accept(response)
+                else:
+                    self.coalesced += 1
+
+        request.headers["Authorization"] = f"Bearer {self.token['access_token']}"
+        response = yield request
+        if response.status_code == 401:
+            event("unauthorized", url=str(request.url))
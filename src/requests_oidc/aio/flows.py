@@ -0,0 +1,296 @@
+import asyncio
+import time
+import webbrowser
+from typing import TYPE_CHECKING, List, Optional
+
+import httpx
+from oauthlib.oauth2 import BackendApplicationClient, WebApplicationClient
+
+from ..exceptions import AuthFlowError
+from ..flows.device_code import _pending, _poll_data, _prompt_user
+from ..flows.utils import access_expired, refresh_expired, scope_mismatch
+from ..instrumentation import span
+from ..types import Plugin
+from ..utils import (
+    DiscoveryCache,
+    RedirectCatcher,
+    ServerDetails,
+    default_cache,
+    make_scope,
+)
+from ..utils.resilience import Backoff, unavailable
+from .auth import AsyncOIDCAuth, aload, aupdate
+
+if TYPE_CHECKING:
+    from ..utils.assertion import ClientAssertion
+
+
+async def _run_sync(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _client(kwargs: dict) -> httpx.AsyncClient:
+    # Or httpx would reject it w/ a TypeError that doesn't say why
+    if "dpop" in kwargs:
+        raise ValueError("Async sessions don't support DPoP, use a sync session factory")
+    return httpx.AsyncClient(**kwargs)
+
+
+async def make_async_client_credentials_session(
+    oidc_url: str,
+    client_id: str,
+    client_secret: Optional[str] = None,
+    scope: Optional[List[str]] = None,
+    *,
+    client_assertion: Optional["ClientAssertion"] = None,
+    plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Async counterpart of :func:`~requests_oidc.make_client_credentials_session`.
+
+    Returns an ``httpx.AsyncClient``, ``kwargs`` are passed to its constructor.
+    There's no ``dpop``, passing one raises ``ValueError``.
+    """
+    if (client_secret is None) == (client_assertion is None):
+        raise ValueError("Give one of client_secret or client_assertion")
+
+    client = _client(kwargs)
+    auth_server = await ServerDetails.adiscover(oidc_url, client, cache=discovery_cache)
+    scope = make_scope(scope)
+    oauth = BackendApplicationClient(client_id=client_id)
+
+    def refresh_body(token: dict) -> str:
+        if client_assertion is not None:
+            return oauth.prepare_request_body(
+                scope=scope, include_client_id=True, **client_assertion.params(auth_server.token_url)
+            )
+        # client_secret_post, oauthlib leaves client_id out unless told to
+        return oauth.prepare_request_body(
+            client_secret=client_secret, scope=scope, include_client_id=True
+        )
+
+    # Like the sync flow, reuse a stored token & otherwise fetch on first request
+    token = await aload(plugin)
+    if token is not None and (
+        "expires_at" not in token or access_expired(token) or scope_mismatch(token, scope)
+    ):
+        token = None
+
+    client.auth = AsyncOIDCAuth(
+        oauth,
+        auth_server.token_url,
+        token,
+        scope=scope,
+        refresh_body=refresh_body,
+        plugin=plugin,
+    )
+
+    return client
+
+
+async def _poll_for_token(
+    client: httpx.AsyncClient,
+    expires_in: float,
+    interval: float,
+    device_code: str,
+    client_id: str,
+    token_url: str,
+) -> dict:
+    backoff = Backoff()
+    failures = 0
+    start = time.time()
+    while (time.time() - start) < expires_in:
+        # Sleep at start so we don't hit the server like, 30ms after we begin the process
+        await asyncio.sleep(interval + (backoff.delay(failures - 1) if failures else 0))
+
+        with span("device.poll", url=token_url) as attrs:
+            res = await client.post(token_url, data=_poll_data(device_code, client_id))
+
+            if res.is_success:
+                break
+
+            try:
+                # Can fail if we didn't get back JSON
+                data = res.json()
+            except ValueError:
+                data = None
+
+            if not _pending(res.status_code, data):
+                res.raise_for_status()
+            attrs["outcome"] = "pending"
+            failures = failures + 1 if unavailable(res.status_code) else 0
+    else:
+        raise AuthFlowError("Device code timed out")
+
+    res.raise_for_status()
+    return res.json()
+
+
+async def device_code_flow(
+    client: httpx.AsyncClient,
+    urls: ServerDetails,
+    client_id: str,
+    scope: List[str],
+    aud: str,
+) -> dict:
+    res = await client.post(
+        urls.device_url,
+        data={"client_id": client_id, "scope": make_scope(scope), "audience": aud},
+    )
+    res.raise_for_status()
+    data = res.json()
+
+    await _run_sync(
+        _prompt_user,
+        data["verification_uri"],
+        data["user_code"],
+        data["verification_uri_complete"],
+    )
+
+    token = await _poll_for_token(
+        client,
+        data["expires_in"],
+        data["interval"],
+        data["device_code"],
+        client_id,
+        urls.token_url,
+    )
+
+    if token["expires_in"]:
+        token["expires_at"] = time.time() + token["expires_in"]
+
+    return token
+
+
+async def make_async_device_code_session(
+    oidc_url: str,
+    client_id: str,
+    audience: str,
+    scope: Optional[List[str]] = None,
+    *,
+    plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Async counterpart of :func:`~requests_oidc.make_device_code_session`.
+
+    Returns an ``httpx.AsyncClient``, ``kwargs`` are passed to its constructor.
+    There's no ``dpop``, passing one raises ``ValueError``.
+    """
+    client = _client(kwargs)
+    auth_server = await ServerDetails.adiscover(oidc_url, client, cache=discovery_cache)
+    scope = make_scope(scope)
+
+    token = await aload(plugin)
+    if token is None or refresh_expired(token, margin=15) or scope_mismatch(token, scope):
+        token = await device_code_flow(client, auth_server, client_id, scope, audience)
+        await aupdate(plugin, token)
+
+    client.auth = AsyncOIDCAuth(
+        WebApplicationClient(client_id),
+        auth_server.token_url,
+        token,
+        refresh_kwargs={"client_id": client_id},
+        plugin=plugin,
+    )
+
+    return client
+
+
+async def make_async_auth_code_session(
+    oidc_url: str,
+    client_id: str,
+    port: int,
+    scope: Optional[List[str]] = None,
+    *,
+    plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Async counterpart of :func:`~requests_oidc.make_auth_code_session`.
+
+    Returns an ``httpx.AsyncClient``, ``kwargs`` are passed to its constructor.
+    There's no ``dpop``, passing one raises ``ValueError``.
+    """
+    client = _client(kwargs)
+    auth_server = await ServerDetails.adiscover(oidc_url, client, cache=discovery_cache)
+    scope = make_scope(scope)
+    oauth = WebApplicationClient(client_id)
+
+    token = await aload(plugin)
+    if token is None or refresh_expired(token, margin=15) or scope_mismatch(token, scope):
+        redirect_catcher = RedirectCatcher(port)
+        state = oauth.state_generator()
+        auth_redirect_url = oauth.prepare_request_uri(
+            auth_server.auth_url,
+            redirect_uri=redirect_catcher.redirect_uri,
+            scope=scope,
+            state=state,
+        )
+        await _run_sync(webbrowser.open, auth_redirect_url)
+        path = await _run_sync(redirect_catcher.catch)
+        code = oauth.parse_request_uri_response(
+            redirect_catcher.redirect_uri + path, state=state
+        )["code"]
+
+        with span("token.fetch", url=auth_server.token_url):
+            res = await client.post(
+                auth_server.token_url,
+                content=oauth.prepare_request_body(
+                    code=code, redirect_uri=redirect_catcher.redirect_uri
+                ),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            res.raise_for_status()
+        token = dict(oauth.parse_request_body_response(res.text, scope=scope))
+        await aupdate(plugin, token)
+
+    client.auth = AsyncOIDCAuth(
+        oauth,
+        auth_server.token_url,
+        token,
+        scope=scope,
+        refresh_kwargs={"client_id": client_id},
+        plugin=plugin,
+    )
+
+    return client
+
+
+async def make_async_token_session(
+    oidc_url: str,
+    client_id: str,
+    scope: Optional[List[str]] = None,
+    *,
+    plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """Async counterpart of :func:`~requests_oidc.make_token_session`.
+
+    Returns an ``httpx.AsyncClient``, ``kwargs`` are passed to its constructor.
+    There's no ``dpop``, passing one raises ``ValueError``.
+    """
+    client = _client(kwargs)
+    auth_server = await ServerDetails.adiscover(oidc_url, client, cache=discovery_cache)
+    scope = make_scope(scope)
+
+    token = await aload(plugin)
+    if token is None:
+        raise RuntimeError("Token not provided!")
+    elif refresh_expired(token, margin=15):
+        raise RuntimeError("Token is expired!")
+    elif scope_mismatch(token, scope):
+        raise RuntimeError("Token scope is wrong!")
+
+    client.auth = AsyncOIDCAuth(
+        WebApplicationClient(client_id),
+        auth_server.token_url,
+        token,
+        scope=scope,
+        refresh_kwargs={"client_id": client_id},
+        plugin=plugin,
+    )
+
+    return client
@@ -0,0 +1,184 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from .exceptions import AuthFlowError
+from .utils import make_scope
+
+if TYPE_CHECKING:
+    from requests_oauthlib import OAuth2Session  # type: ignore
+
+
+def broker_key(
+    client_id: str, audience: Optional[str] = None, scope: Optional[List[str]] = None
+) -> str:
+    """Name a credential served by a :class:`TokenBroker`."""
+    return "|".join([client_id, audience or "", " ".join(sorted(make_scope(scope)))])
+
+
+def _expiring(token: dict, margin: float) -> bool:
+    if not token.get("access_token"):
+        # ie. a lazy session that hasn't fetched its first token yet
+        return True
+    expires_at = token.get("expires_at")
+    return expires_at is not None and time.time() > expires_at - margin
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            res: Dict[str, Any]
+            try:
+                req = json.loads(line)
+                token = self.server.broker.token(req["key"], stale=req.get("stale"))
+                res = {"token": token}
+            except KeyError as e:
+                res = {"error": f"Unknown credential {e}"}
+            except Exception as e:
+                res = {"error": str(e)}
+
+            self.wfile.write(json.dumps(res).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    broker: "TokenBroker"
+
+
+class TokenBroker:
+    """Serves access tokens to other processes over a Unix domain socket.
+
+    Each registered session is the one and only refresher for its credential.
+    Clients (see :class:`BrokerPlugin`) send one JSON line,
+    ``{"key": ..., "stale": <access token they gave up on>}``, and get one back,
+    ``{"token": {...}}`` or ``{"error": "..."}``.
+
+    Pair it w/ a :class:`~requests_oidc.scheduler.RefreshScheduler` so tokens are
+    refreshed ahead of time, otherwise they're refreshed on demand.
+
+    :param socket_path: Where to create the socket, it's made readable by the
+      current user only.
+    :param margin: Refresh tokens expiring within this many seconds before handing
+      them out.
+    """
+
+    def __init__(self, socket_path: Path, margin: float = 15) -> None:
+        self.socket_path = socket_path
+        self.margin = margin
+        self.sessions: Dict[str, "OAuth2Session"] = {}
+        self._server: Optional[_Server] = None
+
+    def register(self, key: str, session: "OAuth2Session") -> None:
+        self.sessions[key] = session
+
+    def token(self, key: str, stale: Optional[str] = None) -> dict:
+        # Deferred, BrokerPlugin clients import this module w/o requests_oauthlib
+        from .session import renew
+
+        session = self.sessions[key]
+        if stale is not None and session.access_token == stale:
+            coordinator = getattr(session, "refresh_coordinator", None)
+            if coordinator is not None:
+                # Only matters if the session opted into a reuse window, which
+                # would hand the rejected token back
+                coordinator.expire()
+            renew(session)
+        elif _expiring(session.token, self.margin):
+            renew(session)
+
+        return session.token
+
+    def serve_forever(self) -> None:
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+
+        self._server.broker = self
+        with self._server:
+            self._server.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Serve on a background daemon thread."""
+        thread = threading.Thread(target=self.serve_forever, name="requests-oidc-broker", daemon=True)
+        thread.start()
+        while self._server is None and thread.is_alive():
+            time.sleep(0.001)
+        return thread
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class BrokerPlugin:
+    """Plugin that gets its token from a :class:`TokenBroker`, rather than storage.
+
+    Tokens are cached in-process until they're about to expire, so sessions can
+    ``load`` before every request for free. Refreshes are delegated to the broker,
+    so however many processes use a credential, only the broker talks to the IdP.
+
+    .. code-block:: python
+
+       plugin = BrokerPlugin("/run/user/1000/oidc.sock", broker_key("my-client"))
+       session = make_token_session(oidc_url, "my-client", plugin=plugin)
+
+    :param socket_path: The broker's socket.
+    :param key: Credential to ask for, see :func:`broker_key`.
+    :param margin: Stop using a cached token this many seconds before it expires.
+    :param timeout: Socket timeout, in seconds.
+    """
+
+    def __init__(
+        self, socket_path: Path, key: str, *, margin: float = 15, timeout: float = 10
+    ) -> None:
+        self.socket_path = socket_path
+        self.key = key
+        self.margin = margin
+        self.timeout = timeout
+        self._token: Optional[dict] = None
+
+    def _ask(self, stale: Optional[str] = None) -> dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.socket_path))
+            with sock.makefile("rwb") as f:
+                f.write(json.dumps({"key": self.key, "stale": stale}).encode() + b"\n")
+                f.flush()
+                res = json.loads(f.readline())
+
+        if "error" in res:
+            raise AuthFlowError(f"Token broker: {res['error']}")
+
+        self._token = res["token"]
+        return res["token"]
+
+    def load(self) -> Optional[dict]:
+        if self._token is not None and not _expiring(self._token, self.margin):
+            return self._token
+
+        try:
+            return self._ask()
+        except OSError:
+            return None
+
+    def update(self, token: dict) -> None:
+        # The broker owns storage
+        pass
+
+    def refresh(self, current: dict, fetch: Callable[[], dict]) -> dict:
+        return self._ask(stale=current.get("access_token"))
@@ -1,10 +1,15 @@
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Optional
+
 import typer
-from typing import Annotated, Never
-from requests_oauthlib import OAuth2Session
-import time
+
+# Flows, plugins etc. are imported inside each command, so ``--help`` and
+# argument errors don't wait on requests / oauthlib to load
 import requests_oidc as flows
-from pathlib import Path
-from .plugins import PathPlugin
+
+if TYPE_CHECKING:
+    from requests_oauthlib import OAuth2Session
 
 app = typer.Typer(no_args_is_help=True)
 daemon_app = typer.Typer(no_args_is_help=True)
@@ -41,13 +46,92 @@ OIDC_MARGIN = typer.Option(
     envvar="OIDC_MARGIN",
     help="How many seconds before access token expirey to wait to refresh.",
 )
+OIDC_JITTER = typer.Option(
+    envvar="OIDC_JITTER",
+    help="Refresh up to this many extra seconds early, at random.",
+)
+OIDC_SOCKET = typer.Option(
+    envvar="OIDC_SOCKET",
+    help="Unix socket to serve tokens to other processes on.",
+)
+OIDC_METRICS_PORT = typer.Option(
+    envvar="OIDC_METRICS_PORT",
+    help="Serve Prometheus metrics on this port, needs the `prometheus` extra.",
+)
+
+@daemon_app.callback()
+def daemon(metrics_port: Annotated[Optional[int], OIDC_METRICS_PORT] = None) -> None:
+    """Keep tokens fresh in the background."""
+    if metrics_port is None:
+        return
+
+    import prometheus_client
+
+    from .instrumentation import PrometheusInstrument, add_instrument
+
+    add_instrument(PrometheusInstrument())
+    prometheus_client.start_http_server(metrics_port)
+
+
+def serve(*sessions: "OAuth2Session", margin: float, jitter: float = 0) -> None:
+    from .scheduler import RefreshScheduler
+
+    scheduler = RefreshScheduler(margin=margin, jitter=jitter)
+    for session in sessions:
+        scheduler.register(session)
+    scheduler.run_forever()
+
+
+@daemon_app.command()
+def config(
+    path: Path,
+    margin: Annotated[int, OIDC_MARGIN] = 15,
+    jitter: Annotated[int, OIDC_JITTER] = 5,
+    socket: Annotated[Optional[Path], OIDC_SOCKET] = None,
+) -> None:
+    """Keep every token listed in a JSON config file fresh, from one process.
+
+    The file holds a list of objects, each w/ a ``flow`` (one of auth_code,
+    device_code, client_credentials, token), optionally the ``path`` to store its
+    token at, and the keyword arguments for that flow's session factory.
+
+    With ``--socket``, tokens are also served to ``BrokerPlugin`` clients, keyed by
+    ``key`` if the object has one, else by client ID, audience and scope.
+    """
+    from .broker import TokenBroker, broker_key
+    from .plugins import PathPlugin
+    from .prefetch import prefetch
+
+    with path.open() as f:
+        specs = json.load(f)
+
+    broker = None if socket is None else TokenBroker(socket, margin=margin)
+
+    keys = []
+    for i, spec in enumerate(specs):
+        # Malformed specs are reported by prefetch, along w/ the other failures
+        key = spec.pop("key", None)
+        if key is None and "client_id" in spec:
+            key = broker_key(spec["client_id"], spec.get("audience"), spec.get("scope"))
+        keys.append(key or f"entry {i}")
+        token_path = spec.pop("path", None)
+        spec["plugin"] = None if token_path is None else PathPlugin(Path(token_path).expanduser())
+
+    # Interactive flows would fight over the terminal & browser
+    interactive = any(spec.get("flow") in ("auth_code", "device_code") for spec in specs)
+    result = prefetch(specs, max_workers=1 if interactive else 8, margin=margin)
+    for i, error in result.errors.items():
+        typer.echo(f"Failed to get a token for {keys[i]}: {error}", err=True)
+    if not result.ok:
+        raise typer.Exit(1)
+
+    if broker is not None:
+        for key, session in zip(keys, result.sessions):
+            broker.register(key, session)
+        broker.start()
+
+    serve(*result.sessions, margin=margin, jitter=jitter)
 
-def hibernate(session: OAuth2Session, margin: int) -> Never:
-    while True:
-        time.sleep(session.token["expires_in"] - margin)
-        # requests_oauthlib is very bad, why isn't this kicked off from .refresh_token?
-        token = session.refresh_token(session.auto_refresh_url)
-        session.token_updater(token)
 
 @daemon_app.command()
 def auth_code(
@@ -58,6 +142,8 @@ def auth_code(
     offline_access: Annotated[bool, OIDC_OFFLINE] = False,
     margin: Annotated[int, OIDC_MARGIN] = 15,
 ) -> None:
+    from .plugins import PathPlugin
+
     scope = []
 
     if offline_access:
@@ -71,7 +157,7 @@ def auth_code(
         plugin=PathPlugin(path),
     )
 
-    hibernate(session, margin)
+    serve(session, margin=margin)
 
 
 @daemon_app.command()
@@ -83,13 +169,14 @@ def device_code(
     offline_access: Annotated[bool, OIDC_OFFLINE] = False,
     margin: Annotated[int, OIDC_MARGIN] = 15,
 ) -> None:
+    from .plugins import PathPlugin
+
     scope = []
 
     if offline_access:
         scope.append("offline_access")
 
     session = flows.make_device_code_session(
-        path=path,
         oidc_url=oidc_url,
         client_id=client_id,
         audience=audience,
@@ -97,7 +184,7 @@ def device_code(
         plugin=PathPlugin(path),
     )
 
-    hibernate(session, margin)
+    serve(session, margin=margin)
 
 
 @daemon_app.command()
@@ -108,6 +195,8 @@ def client_credentials(
     client_secret: Annotated[str, OIDC_CLIENT_SECRET],
     margin: Annotated[int, OIDC_MARGIN] = 15,
 ) -> None:
+    from .plugins import PathPlugin
+
     session = flows.make_client_credentials_session(
         oidc_url=oidc_url,
         client_id=client_id,
@@ -115,4 +204,4 @@ def client_credentials(
         plugin=PathPlugin(path),
     )
 
-    hibernate(session, margin)
+    serve(session, margin=margin)
@@ -0,0 +1,124 @@
+"""Prints a token from a token file, for shell scripts & credential helpers::
+
+    curl -H "$(requests-oidc-token ~/.cache/app/token.json --header)" https://api.example/
+    requests-oidc-token --app my-tool --app-author me
+
+While the stored token is valid for ``--margin`` more seconds, this only reads
+the file: no ``requests``, ``oauthlib`` or ``typer`` is imported, so it's cheap to
+run before every call. Otherwise the token is refreshed w/ its refresh token, or
+fetched again w/ ``--client-secret``, both needing ``--oidc-url`` & ``--client-id``.
+Refreshes lock the file, so scripts running in parallel refresh once between them.
+
+Exits w/ status ``1`` if there's no token and it can't get one.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from .types import Plugin
+
+
+def _path(args: argparse.Namespace) -> Path:
+    if args.path is not None:
+        return args.path.expanduser()
+
+    import platformdirs
+
+    dirs = platformdirs.PlatformDirs(args.app, args.app_author, args.app_version)
+    return dirs.user_cache_path / args.filename
+
+
+def _cached(path: Path, margin: float) -> Optional[dict]:
+    try:
+        with path.open() as f:
+            token = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    expires_at = token.get("expires_at")
+    if "access_token" not in token or expires_at is None or time.time() > expires_at - margin:
+        return None
+    return token
+
+
+def _renew(path: Path, args: argparse.Namespace) -> dict:
+    # The slow path, only taken once per token lifetime
+    import requests_oidc as flows
+
+    from .flows.utils import refresh_expired
+    from .plugins import LockingPathPlugin, PathPlugin
+
+    if not args.oidc_url or not args.client_id:
+        raise SystemExit(f"No valid token in {path}, set --oidc-url & --client-id to get one")
+
+    plugin: "Plugin"
+    try:
+        plugin = LockingPathPlugin(path)
+    except RuntimeError:
+        # No fcntl, parallel scripts may each refresh
+        plugin = PathPlugin(path)
+
+    # Another script may have just refreshed it
+    stored = _cached(path, args.margin)
+    if stored is not None:
+        return stored
+
+    stored = plugin.load()
+    if args.client_secret:
+        session = flows.make_client_credentials_session(
+            args.oidc_url, args.client_id, args.client_secret, plugin=plugin
+        )
+        return session.warm_up(args.margin)
+
+    # The same margin make_token_session refuses tokens w/
+    if stored is None or "refresh_token" not in stored or refresh_expired(stored, margin=15):
+        raise SystemExit(f"The token in {path} can't be refreshed, log in again")
+
+    try:
+        session = flows.make_token_session(args.oidc_url, args.client_id, plugin=plugin)
+    except RuntimeError as e:
+        raise SystemExit(f"The token in {path} can't be refreshed ({e}), log in again")
+    token = session.refresh_token(session.auto_refresh_url)
+    session.token_updater(token)
+    return token
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="requests-oidc-token",
+        description="Print an access token from a token file, refreshing it if needed.",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("path", nargs="?", type=Path, help="Token file, ie. a PathPlugin's.")
+    source.add_argument("--app", help="Read an OSCachedPlugin's file for this app instead.")
+    parser.add_argument("--app-author")
+    parser.add_argument("--app-version")
+    parser.add_argument("--filename", default="token.json")
+    parser.add_argument(
+        "--header", action="store_true", help="Print an `Authorization` header instead."
+    )
+    parser.add_argument(
+        "--margin", type=float, default=15, help="Refresh tokens expiring in this many seconds."
+    )
+    parser.add_argument("--oidc-url", default=os.environ.get("OIDC_URL"))
+    parser.add_argument("--client-id", default=os.environ.get("OIDC_CLIENT_ID"))
+    parser.add_argument("--client-secret", default=os.environ.get("OIDC_CLIENT_SECRET"))
+    args = parser.parse_args(argv)
+
+    path = _path(args)
+    token = _cached(path, args.margin) or _renew(path, args)
+
+    if args.header:
+        scheme = "DPoP" if token.get("token_type", "").lower() == "dpop" else "Bearer"
+        sys.stdout.write(f"Authorization: {scheme} {token['access_token']}\n")
+    else:
+        sys.stdout.write(f"{token['access_token']}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,10 @@
 class AuthFlowError(Exception):
     pass
+
+
+class RefreshTimeoutError(AuthFlowError):
+    pass
+
+
+class CircuitOpenError(AuthFlowError):
+    pass
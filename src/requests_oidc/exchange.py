@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests_oauthlib import OAuth2Session  # type: ignore
+
+from .exceptions import AuthFlowError
+from .instrumentation import span
+from .session import renew
+
+TOKEN_EXCHANGE_GRANT = "urn:ietf:params:oauth:grant-type:token-exchange"
+ACCESS_TOKEN_TYPE = "urn:ietf:params:oauth:token-type:access_token"
+
+Key = Tuple[Optional[str], Tuple[str, ...]]
+
+
+class _Entry:
+    __slots__ = ("lock", "token")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.token: Optional[dict] = None
+
+
+class TokenExchanger:
+    """Trades a session's access token for tokens to other audiences / scopes,
+    w/ an RFC 8693 token exchange.
+
+    Exchanged tokens are cached per ``(audience, scope)`` until ``margin`` seconds
+    before they expire, so fanning out to many services takes one login, and at
+    most one exchange per audience per token lifetime.
+
+    .. code-block:: python
+
+       session = make_device_code_session(oidc_url, "cli", "gateway")
+       exchanger = TokenExchanger(session)
+       requests.get(billing_url, auth=exchanger.auth("billing"))
+
+    :param session: Session whose access token is the subject token. It's
+      refreshed first if it has expired.
+    :param client_secret: For confidential clients, sent w/ the client ID.
+    :param token_url: The IdP's token endpoint, defaults to the session's
+      ``auto_refresh_url``.
+    :param margin: Re-exchange tokens expiring within this many seconds.
+    """
+
+    def __init__(
+        self,
+        session: OAuth2Session,
+        *,
+        client_secret: Optional[str] = None,
+        token_url: Optional[str] = None,
+        margin: float = 30,
+    ) -> None:
+        self.session = session
+        self.client_secret = client_secret
+        self.token_url = token_url or session.auto_refresh_url
+        self.margin = margin
+        self._entries: Dict[Key, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _expiring(self, token: dict) -> bool:
+        expires_at = token.get("expires_at")
+        return expires_at is not None and time.time() > expires_at - self.margin
+
+    def _subject_token(self) -> str:
+        if not self.session.access_token or self._expiring(self.session.token):
+            renew(self.session)
+        return self.session.access_token
+
+    def _exchange(self, audience: Optional[str], scope: List[str]) -> dict:
+        data = {
+            "grant_type": TOKEN_EXCHANGE_GRANT,
+            "subject_token": self._subject_token(),
+            "subject_token_type": ACCESS_TOKEN_TYPE,
+            "requested_token_type": ACCESS_TOKEN_TYPE,
+            "client_id": self.session.client_id,
+        }
+        if audience is not None:
+            data["audience"] = audience
+        if scope:
+            data["scope"] = " ".join(scope)
+        if self.client_secret is not None:
+            data["client_secret"] = self.client_secret
+
+        with span("token.exchange", url=self.token_url, audience=audience or ""):
+            # Through the session, for its connection pool, but w/o its token
+            res = self.session.post(self.token_url, data=data, withhold_token=True)
+            try:
+                token = res.json()
+            except ValueError:
+                token = {}
+            if not res.ok or "access_token" not in token:
+                raise AuthFlowError(
+                    f"Token exchange for {audience or 'the same audience'} failed: "
+                    f"{token.get('error', res.status_code)}"
+                )
+
+        if "expires_in" in token:
+            token["expires_at"] = time.time() + token["expires_in"]
+        return token
+
+    def token(self, audience: Optional[str] = None, scope: Optional[List[str]] = None) -> dict:
+        """An exchanged token for ``audience`` & ``scope``, from cache if it's still good.
+
+        ``scope`` is sent as given, w/o ``openid`` added, so it can downscope the token.
+        """
+        scope = sorted(set(scope or []))
+        key = (audience, tuple(scope))
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+
+        # Per-key lock, so concurrent callers share one exchange
+        with entry.lock:
+            if entry.token is None or self._expiring(entry.token):
+                entry.token = self._exchange(audience, scope)
+            return entry.token
+
+    def auth(
+        self, audience: Optional[str] = None, scope: Optional[List[str]] = None
+    ) -> "ExchangedTokenAuth":
+        """``requests`` auth that sends exchanged tokens for ``audience`` & ``scope``."""
+        return ExchangedTokenAuth(self, audience, scope)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ExchangedTokenAuth(requests.auth.AuthBase):
+    """Adds a :class:`TokenExchanger`'s token to each request, see :meth:`TokenExchanger.auth`."""
+
+    def __init__(
+        self,
+        exchanger: TokenExchanger,
+        audience: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+    ) -> None:
+        self.exchanger = exchanger
+        self.audience = audience
+        self.scope = scope
+
+    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        token = self.exchanger.token(self.audience, self.scope)
+        dpop = getattr(self.exchanger.session, "dpop", None)
+        if dpop is not None and token.get("token_type", "").lower() == "dpop":
+            request.headers.update(dpop.headers(request.method, request.url, token["access_token"]))
+        else:
+            request.headers["Authorization"] = f"Bearer {token['access_token']}"
+        return request
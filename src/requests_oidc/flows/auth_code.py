@@ -1,11 +1,25 @@
 import webbrowser
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
+import requests
 from requests_oauthlib import OAuth2Session  # type: ignore
 
+from ..instrumentation import plugin_load, plugin_update
+from ..session import OIDCSession
 from ..types import Plugin
-from ..utils import RedirectCatcher, ServerDetails, make_scope
-from .utils import refresh_expired, scope_mismatch
+from ..utils import (
+    DiscoveryCache,
+    RedirectCatcher,
+    ServerDetails,
+    default_cache,
+    default_http,
+    make_scope,
+    share_pool,
+)
+from .utils import make_validator, oidc_kwargs, refresh_expired, scope_mismatch
+
+if TYPE_CHECKING:
+    from ..utils.dpop import DPoP
 
 
 def make_auth_code_session(
@@ -14,31 +28,47 @@ def make_auth_code_session(
     port: int,
     scope: Optional[List[str]] = None,
     *,
-    klass=OAuth2Session,
+    klass=OIDCSession,
     plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    http: Optional[requests.Session] = None,
+    validate: bool = False,
+    dpop: Optional["DPoP"] = None,
     **kwargs,
 ) -> OAuth2Session:
     # Docstring set below to leverage f-strings
 
-    auth_server = ServerDetails.discover(oidc_url)
+    http = http or default_http()
+    auth_server = ServerDetails.discover(oidc_url, cache=discovery_cache, http=http)
+    validator = make_validator(auth_server, client_id, http) if validate else None
+    if dpop is not None:
+        dpop.bind(auth_server.dpop_algs)
     redirect_catcher = RedirectCatcher(port)
     scope = make_scope(scope)
 
     def updater(token: dict) -> None:
-        if plugin:
-            plugin.update(token)
+        plugin_update(plugin, token)
 
-    token = None if plugin is None else plugin.load()
+    token = plugin_load(plugin)
+    if token is not None and validator is not None:
+        validator.apply(token)
     if token is None or refresh_expired(token, margin=15) or scope_mismatch(token, scope):
-        session = OAuth2Session(
+        session = OIDCSession(
             redirect_uri=redirect_catcher.redirect_uri,
             client_id=client_id,
             scope=scope,
+            auto_refresh_url=auth_server.token_url,
+            dpop=dpop,
         )
-        auth_redirect_url, _ = session.authorization_url(auth_server.auth_url)
+        share_pool(session, http, auth_server.token_url)
+        # Binds the code to our key too, so it's no use to whoever intercepts it
+        bind = {} if dpop is None else {"dpop_jkt": dpop.thumbprint}
+        auth_redirect_url, _ = session.authorization_url(auth_server.auth_url, **bind)
         webbrowser.open(auth_redirect_url)
         path = redirect_catcher.catch()
         token = session.fetch_token(auth_server.token_url, authorization_response=path)
+        if validator is not None:
+            validator.apply(token)
         updater(token)
 
     session = klass(
@@ -48,8 +78,10 @@ def make_auth_code_session(
         token_updater=updater,
         client_id=client_id,
         scope=make_scope(scope),
+        **oidc_kwargs(klass, OIDCSession, plugin, validator=validator, dpop=dpop),
         **kwargs,
     )
+    share_pool(session, http, auth_server.token_url)
 
     return session
 
@@ -78,6 +110,14 @@ make_auth_code_session.__doc__ = f""" Create an `OAuth2Session <https://requests
       or the auth server will refuse to service your auth request.
     :param updater: Optional callback function to invoke whenever a token is fetched.
       This includes the first token fetch, and all refetches thereafter.
+    :param discovery_cache: Cache for the server's discovery document, ``None`` to
+      always refetch it.
+    :param http: Session whose connection pool is used for all traffic w/ the IdP,
+      the returned session's token requests included. Defaults to a process-wide one.
+    :param dpop: Get DPoP-bound tokens, see :class:`~requests_oidc.utils.dpop.DPoP`.
+    :param validate: Validate tokens w/ the IdP's keys, see
+      :class:`~requests_oidc.utils.jwks.TokenValidator`. A ``clock_skew`` passed
+      on to ``klass`` only corrects expiry w/ this.
 
 
     .. _O2S: 
@@ -1,45 +1,115 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
+import requests
 from oauthlib.oauth2 import BackendApplicationClient
-from requests_oauthlib import OAuth2Session  # type: ignore
 
+from ..instrumentation import plugin_load, plugin_update
+from ..session import ClientCredentialsSession, renew
 from ..types import Plugin
-from ..utils import ServerDetails, make_scope
+from ..utils import (
+    DiscoveryCache,
+    ServerDetails,
+    default_cache,
+    default_http,
+    make_scope,
+    share_pool,
+)
+from .utils import access_expired, make_validator, oidc_kwargs, scope_mismatch
+
+if TYPE_CHECKING:
+    from ..utils.assertion import ClientAssertion
+    from ..utils.dpop import DPoP
 
 
 def make_client_credentials_session(
     oidc_url: str,
     client_id: str,
-    client_secret: str,
+    client_secret: Optional[str] = None,
     scope: Optional[List[str]] = None,
     *,
-    klass=OAuth2Session,
+    client_assertion: Optional["ClientAssertion"] = None,
+    audience: Optional[str] = None,
+    dpop: Optional["DPoP"] = None,
+    klass=ClientCredentialsSession,
     plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    http: Optional[requests.Session] = None,
+    validate: bool = False,
     **kwargs,
-) -> OAuth2Session:
-    auth_server = ServerDetails.discover(oidc_url)
+) -> ClientCredentialsSession:
+    """Session for the client credentials grant.
+
+    A token still valid in ``plugin`` is reused, otherwise none is fetched until
+    the session's first request, or
+    :meth:`~requests_oidc.session.ClientCredentialsSession.warm_up`. So a restarting
+    fleet doesn't all hit the IdP at once, just to sit idle.
+
+    :param client_assertion: Authenticate w/ a signed JWT instead of
+      ``client_secret``, for ``private_key_jwt`` & ``client_secret_jwt``, see
+      :class:`~requests_oidc.utils.assertion.ClientAssertion`.
+    :param audience: Sent w/ the grant, for IdPs that issue tokens per audience.
+    :param dpop: Get DPoP-bound tokens, see :class:`~requests_oidc.utils.dpop.DPoP`.
+    :param validate: Validate tokens w/ the IdP's keys, see
+      :class:`~requests_oidc.utils.jwks.TokenValidator`. A ``clock_skew`` passed
+      on to ``klass`` only corrects expiry w/ this.
+    :param klass: A :class:`~requests_oidc.session.ClientCredentialsSession` subclass,
+      or ``OAuth2Session``, which fetches a token right away, and a new one whenever
+      it expires. That can't do ``client_assertion``, ``dpop`` or ``validate``.
+    """
+    if (client_secret is None) == (client_assertion is None):
+        raise ValueError("Give one of client_secret or client_assertion")
+
+    http = http or default_http()
+    auth_server = ServerDetails.discover(oidc_url, cache=discovery_cache, http=http)
+    validator = make_validator(auth_server, client_id, http) if validate else None
+    if dpop is not None:
+        dpop.bind(auth_server.dpop_algs)
     client = BackendApplicationClient(client_id=client_id)
     scope = make_scope(scope)
 
     def updater(token: dict) -> None:
-        if plugin:
-            plugin.update(token)
+        plugin_update(plugin, token)
+
+    token = plugin_load(plugin)
+    if token is not None and validator is not None:
+        validator.apply(token)
+    if token is not None and (
+        "expires_at" not in token or access_expired(token) or scope_mismatch(token, scope)
+    ):
+        token = None
+
+    grant_kwargs = None if audience is None else {"audience": audience}
+    oidc = oidc_kwargs(
+        klass,
+        ClientCredentialsSession,
+        plugin,
+        validator=validator,
+        client_assertion=client_assertion,
+        dpop=dpop,
+    )
+    if oidc:
+        oidc.update(client_secret=client_secret, grant_kwargs=grant_kwargs)
 
     session = klass(
         client=client,
         auto_refresh_url=auth_server.token_url,
+        token=token,
         token_updater=updater,
         scope=scope,
+        **oidc,
         **kwargs,
     )
+    share_pool(session, http, auth_server.token_url)
 
-    def refresh_token(url, *args, **kwargs) -> dict:
-        return session.fetch_token(
-            url, client_id=client_id, client_secret=client_secret
-        )
+    if not oidc:
+        # A plain OAuth2Session has no refresh token to use, fetch a new token instead
+        def refresh_token(url, *args, **kwargs) -> dict:
+            return session.fetch_token(
+                url, client_id=client_id, client_secret=client_secret, **(grant_kwargs or {})
+            )
 
-    session.refresh_token = refresh_token
-    token = session.refresh_token(session.auto_refresh_url)
-    updater(token)
+        session.refresh_token = refresh_token
+        if token is None:
+            renew(session)
 
     return session
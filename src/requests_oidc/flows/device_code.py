@@ -1,19 +1,31 @@
 import io
 import time
-import webbrowser
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-import qrcode  # type: ignore
 import requests
-from requests_oauthlib import OAuth2Session  # type: ignore
 
 from ..exceptions import AuthFlowError
+from ..instrumentation import plugin_load, plugin_update, span
+from ..session import OIDCSession
 from ..types import Plugin
-from ..utils import ServerDetails, make_scope
-from .utils import refresh_expired, scope_mismatch
+from ..utils import (
+    DiscoveryCache,
+    ServerDetails,
+    default_cache,
+    default_http,
+    make_scope,
+    share_pool,
+)
+from ..utils.resilience import Backoff, unavailable
+from .utils import make_validator, oidc_kwargs, refresh_expired, scope_mismatch
+
+if TYPE_CHECKING:
+    from ..utils.dpop import DPoP
 
 
 def _make_qr(msg: str) -> str:
+    import qrcode  # type: ignore
+
     qr = qrcode.QRCode()
     qr.add_data(msg)
     f = io.StringIO()
@@ -23,6 +35,8 @@ def _make_qr(msg: str) -> str:
 
 
 def _prompt_user(partial_url: str, user_code: str, full_url: str) -> None:
+    import webbrowser
+
     webbrowser.open(full_url)
 
     # Stole this prompt from AWS SSO
@@ -42,58 +56,98 @@ Then enter the code:
     print(_make_qr(full_url))
 
 
+def _poll_data(device_code: str, client_id: str) -> dict:
+    return {
+        "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
+        "device_code": device_code,
+        "client_id": client_id,
+    }
+
+
+def _pending(status_code: int, data: Optional[dict]) -> bool:
+    """Whether a failed poll means "keep waiting", raising if it means "give up"."""
+    if unavailable(status_code):
+        # The IdP is struggling, the device code's still good though
+        return True
+
+    if data is None:
+        return False
+
+    if data["error"] == "authorization_pending":
+        return True
+    elif data["error"] == "slow_down":
+        # Should never get this, we're waiting correctly
+        return True
+    elif data["error"] == "expired_token":
+        raise AuthFlowError("Device code timed out")
+    elif data["error"] == "invalid_grant":
+        raise AuthFlowError("Device code timed out or was invalid")
+    elif data["error"] == "access_denied":
+        raise AuthFlowError("Idiot")
+    else:
+        return False
+
+
+def _post(
+    http: requests.Session, url: str, data: dict, dpop: Optional["DPoP"]
+) -> requests.Response:
+    if dpop is None:
+        return http.post(url, data=data)
+
+    res = http.post(url, data=data, headers=dpop.headers("POST", url))
+    if dpop.observe(res):
+        res = http.post(url, data=data, headers=dpop.headers("POST", url))
+    return res
+
+
 def _poll_for_token(
-    expires_in: float, interval: float, device_code: str, client_id: str, token_url: str
+    expires_in: float,
+    interval: float,
+    device_code: str,
+    client_id: str,
+    token_url: str,
+    http: Optional[requests.Session] = None,
+    dpop: Optional["DPoP"] = None,
 ) -> dict:
+    http = http or default_http()
+    backoff = Backoff()
+    failures = 0
     start = time.time()
     while (time.time() - start) < expires_in:
         # Sleep at start so we don't hit the server like, 30ms after we begin the process
-        time.sleep(interval)
-
-        res = requests.post(
-            token_url,
-            data={
-                "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
-                "device_code": device_code,
-                "client_id": client_id,
-            },
-        )
-
-        if res.ok:
-            break
-
-        if res.status_code > 500:
-            raise AuthFlowError("Server error talking to OIDC server")
-
-        try:
-            # Can fail if we didn't get back JSON
-            data = res.json()
-        except:
-            res.raise_for_status()
-
-        if data["error"] == "authorization_pending":
-            continue
-        elif data["error"] == "slow_down":
-            # Should never get this, we're waiting correctly
-            continue
-        elif data["error"] == "expired_token":
-            raise AuthFlowError("Device code timed out")
-        elif data["error"] == "invalid_grant":
-            raise AuthFlowError("Device code timed out or was invalid")
-        elif data["error"] == "access_denied":
-            raise AuthFlowError("Idiot")
-        else:
-            res.raise_for_status()
-            continue
+        time.sleep(interval + (backoff.delay(failures - 1) if failures else 0))
+
+        with span("device.poll", url=token_url) as attrs:
+            res = _post(http, token_url, _poll_data(device_code, client_id), dpop)
+
+            if res.ok:
+                break
+
+            try:
+                # Can fail if we didn't get back JSON
+                data = res.json()
+            except:
+                data = None
+
+            if not _pending(res.status_code, data):
+                res.raise_for_status()
+            attrs["outcome"] = "pending"
+            failures = failures + 1 if unavailable(res.status_code) else 0
 
     res.raise_for_status()
     return res.json()
 
 
 def device_code_flow(
-    urls: ServerDetails, client_id: str, scope: List[str], aud: str
+    urls: ServerDetails,
+    client_id: str,
+    scope: List[str],
+    aud: str,
+    http: Optional[requests.Session] = None,
+    dpop: Optional["DPoP"] = None,
 ) -> dict:
-    res = requests.post(
+    http = http or default_http()
+    res = http.post(
         urls.device_url,
         data={"client_id": client_id, "scope": make_scope(scope), "audience": aud},
     )
@@ -110,6 +164,8 @@ def device_code_flow(
         data["device_code"],
         client_id,
         urls.token_url,
+        http,
+        dpop,
     )
 
     if token["expires_in"]:
@@ -125,20 +181,38 @@ def make_device_code_session(
     token: Optional[dict] = None,
     scope: Optional[List[str]] = None,
     *,
-    klass=OAuth2Session,
+    klass=OIDCSession,
     plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    http: Optional[requests.Session] = None,
+    validate: bool = False,
+    dpop: Optional["DPoP"] = None,
     **kwargs,
 ):
-    auth_server = ServerDetails.discover(oidc_url)
+    """Session for the device code grant, reusing the token in ``plugin`` while
+    it can still be refreshed.
+
+    :param validate: Validate tokens w/ the IdP's keys, see
+      :class:`~requests_oidc.utils.jwks.TokenValidator`. A ``clock_skew`` passed
+      on to ``klass`` only corrects expiry w/ this.
+    """
+    http = http or default_http()
+    auth_server = ServerDetails.discover(oidc_url, cache=discovery_cache, http=http)
+    validator = make_validator(auth_server, client_id, http) if validate else None
+    if dpop is not None:
+        dpop.bind(auth_server.dpop_algs)
     scope = make_scope(scope)
 
     def updater(token: dict) -> None:
-        if plugin:
-            plugin.update(token)
+        plugin_update(plugin, token)
 
-    token = None if plugin is None else plugin.load()
+    token = plugin_load(plugin)
+    if token is not None and validator is not None:
+        validator.apply(token)
     if token is None or refresh_expired(token, margin=15) or scope_mismatch(token, scope):
-        token = device_code_flow(auth_server, client_id, scope, audience)
+        token = device_code_flow(auth_server, client_id, scope, audience, http, dpop)
+        if validator is not None:
+            validator.apply(token)
         updater(token)
 
     session = klass(
@@ -146,7 +220,9 @@ def make_device_code_session(
         auto_refresh_kwargs={"client_id": client_id},
         token=token,
         token_updater=updater,
+        **oidc_kwargs(klass, OIDCSession, plugin, validator=validator, dpop=dpop),
         **kwargs,
     )
+    share_pool(session, http, auth_server.token_url)
 
     return session
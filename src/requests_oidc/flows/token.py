@@ -1,10 +1,23 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
+import requests
 from requests_oauthlib import OAuth2Session  # type: ignore
 
+from ..instrumentation import plugin_load, plugin_update
+from ..session import OIDCSession
 from ..types import Plugin
-from ..utils import ServerDetails, make_scope
-from .utils import refresh_expired, scope_mismatch
+from ..utils import (
+    DiscoveryCache,
+    ServerDetails,
+    default_cache,
+    default_http,
+    make_scope,
+    share_pool,
+)
+from .utils import make_validator, oidc_kwargs, refresh_expired, scope_mismatch
+
+if TYPE_CHECKING:
+    from ..utils.dpop import DPoP
 
 
 def make_token_session(
@@ -12,18 +25,33 @@ def make_token_session(
     client_id: str,
     scope: Optional[List[str]] = None,
     *,
-    klass=OAuth2Session,
+    klass=OIDCSession,
     plugin: Optional[Plugin] = None,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    http: Optional[requests.Session] = None,
+    validate: bool = False,
+    dpop: Optional["DPoP"] = None,
     **kwargs,
 ) -> OAuth2Session:
-    auth_server = ServerDetails.discover(oidc_url)
+    """Session for the token in ``plugin``, which has to be refreshable still.
+
+    :param validate: Validate tokens w/ the IdP's keys, see
+      :class:`~requests_oidc.utils.jwks.TokenValidator`. A ``clock_skew`` passed
+      on to ``klass`` only corrects expiry w/ this.
+    """
+    http = http or default_http()
+    auth_server = ServerDetails.discover(oidc_url, cache=discovery_cache, http=http)
+    validator = make_validator(auth_server, client_id, http) if validate else None
+    if dpop is not None:
+        dpop.bind(auth_server.dpop_algs)
     scope = make_scope(scope)
 
     def updater(token: dict) -> None:
-        if plugin:
-            plugin.update(token)
+        plugin_update(plugin, token)
 
-    token = None if plugin is None else plugin.load()
+    token = plugin_load(plugin)
+    if token is not None and validator is not None:
+        validator.apply(token)
     if token is None:
         raise RuntimeError("Token not provided!")
     elif refresh_expired(token, margin=15):
@@ -38,7 +66,9 @@ def make_token_session(
         token_updater=updater,
         client_id=client_id,
         scope=make_scope(scope),
+        **oidc_kwargs(klass, OIDCSession, plugin, validator=validator, dpop=dpop),
         **kwargs,
     )
+    share_pool(session, http, auth_server.token_url)
 
     return session
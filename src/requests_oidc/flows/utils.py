@@ -1,5 +1,14 @@
 import time
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..exceptions import AuthFlowError
+from ..types import Plugin
+
+if TYPE_CHECKING:
+    import requests
+
+    from ..utils import ServerDetails
+    from ..utils.jwks import TokenValidator
 
 
 def access_expired(token: dict, margin: int = 0) -> bool:
@@ -13,7 +22,42 @@ def refresh_expired(token: dict, margin: int = 0) -> bool:
     refresh_expires_at = (
         token["refresh_expires_in"] - token["expires_in"] + token["expires_at"]
     )
-    return (time.time() + margin) > (refresh_expires_at + margin)
+    return time.time() + margin > refresh_expires_at
+
 
 def scope_mismatch(token: dict, scopes: List[str]) -> bool:
     return any(scope not in token['scope'] for scope in scopes)
+
+
+def oidc_kwargs(
+    klass: Any, base: type, plugin: Optional[Plugin], **features: Any
+) -> Dict[str, Any]:
+    """Keyword arguments only ``base`` takes, for a session factory's ``klass``.
+
+    A plain ``OAuth2Session`` gets none of them, its ``token_updater`` still keeps
+    ``plugin`` up to date, but ``features`` it can't provide raise ``ValueError``.
+    """
+    if isinstance(klass, type) and issubclass(klass, base):
+        return {"plugin": plugin, **features}
+
+    given = [name for name, value in features.items() if value is not None]
+    if given:
+        raise ValueError(f"{', '.join(given)} needs klass to be a {base.__name__}")
+    return {}
+
+
+def make_validator(
+    auth_server: "ServerDetails", client_id: str, http: Optional["requests.Session"] = None
+) -> "TokenValidator":
+    # Deferred, pyjwt is an optional dependency
+    from ..utils.jwks import JWKSCache, TokenValidator
+
+    if auth_server.jwks_uri is None:
+        raise AuthFlowError(f"{auth_server.oidc_url} doesn't advertise a jwks_uri")
+
+    return TokenValidator(
+        JWKSCache.for_uri(auth_server.jwks_uri, http),
+        auth_server.issuer,
+        client_id,
+        id_token_algs=auth_server.id_token_algs,
+    )
@@ -0,0 +1,183 @@
+"""Hooks for watching what the library does w/ tokens.
+
+Each instrumented operation is reported to every registered instrument once it
+finishes, as an :class:`Event`:
+
+===================  =====================================================
+``discovery``        Fetching a discovery document. ``outcome`` is ``hit``,
+                     ``revalidated``, ``fetched`` or ``uncached``.
+``token.fetch``      Getting a token from the token endpoint w/ a grant.
+``token.refresh``    Refreshing a token at the token endpoint.
+``token.exchange``   Exchanging a token for another, w/ its ``audience``.
+``device.poll``      One device-code poll, ``outcome`` ``pending`` until approved.
+``plugin.load``      ``plugin.load()``, w/ the plugin's class as ``plugin``.
+``plugin.update``    ``plugin.update()``, likewise.
+``unauthorized``     A request came back ``401``, w/ no duration.
+===================  =====================================================
+
+``outcome`` is ``ok`` unless stated, or the exception's class name when the
+operation raised.
+
+.. code-block:: python
+
+   add_instrument(PrometheusInstrument())
+   add_instrument(OpenTelemetryInstrument())
+
+Nothing is measured while no instruments are registered.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Protocol
+
+if TYPE_CHECKING:
+    from .types import Plugin
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    name: str
+    #: ``outcome`` & anything else known about the operation.
+    attrs: Dict[str, str]
+    #: Wall-clock time it started at.
+    start: float
+    #: Seconds it took, ``None`` for point-in-time events.
+    duration: Optional[float] = None
+
+    @property
+    def outcome(self) -> str:
+        return self.attrs.get("outcome", "ok")
+
+
+class Instrument(Protocol):
+    def record(self, event: Event) -> None:
+        ...
+
+
+_instruments: List[Instrument] = []
+
+
+def add_instrument(instrument: Instrument) -> None:
+    """Start reporting events to ``instrument``, process-wide."""
+    _instruments.append(instrument)
+
+
+def remove_instrument(instrument: Instrument) -> None:
+    _instruments.remove(instrument)
+
+
+def _emit(event: Event) -> None:
+    for instrument in list(_instruments):
+        try:
+            instrument.record(event)
+        except Exception:
+            # A broken metrics backend mustn't break authentication
+            log.exception("Instrument %r failed to record %s", instrument, event.name)
+
+
+def event(name: str, **attrs: str) -> None:
+    """Report a point-in-time event."""
+    if _instruments:
+        _emit(Event(name, attrs, time.time()))
+
+
+@contextmanager
+def span(name: str, **attrs: str) -> Iterator[Dict[str, str]]:
+    """Time the enclosed block & report it as ``name``.
+
+    Yields the event's attributes, so the block can fill in its ``outcome``.
+    """
+    if not _instruments:
+        yield attrs
+        return
+
+    start = time.time()
+    began = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["outcome"] = type(e).__name__
+        raise
+    finally:
+        attrs.setdefault("outcome", "ok")
+        _emit(Event(name, attrs, start, time.perf_counter() - began))
+
+
+def plugin_load(plugin: Optional["Plugin"]) -> Optional[dict]:
+    """``plugin.load()``, reported as ``plugin.load``."""
+    if plugin is None:
+        return None
+    with span("plugin.load", plugin=type(plugin).__name__):
+        return plugin.load()
+
+
+def plugin_update(plugin: Optional["Plugin"], token: dict) -> None:
+    """``plugin.update(token)``, reported as ``plugin.update``."""
+    if plugin is None:
+        return
+    with span("plugin.update", plugin=type(plugin).__name__):
+        plugin.update(token)
+
+
+class PrometheusInstrument:
+    """Records events as Prometheus metrics, needs the ``prometheus`` extra.
+
+    * ``<namespace>_events_total``, a counter by ``event`` & ``outcome``
+    * ``<namespace>_event_duration_seconds``, a histogram by ``event`` & ``outcome``
+
+    :param registry: Registry to add the metrics to, the default one if not given.
+    :param namespace: Prefix of the metric names.
+    """
+
+    def __init__(self, registry: Any = None, namespace: str = "requests_oidc") -> None:
+        import prometheus_client
+
+        registry = registry or prometheus_client.REGISTRY
+        labels = ["event", "outcome"]
+        self.events = prometheus_client.Counter(
+            "events_total", "Token lifecycle events.", labels, namespace=namespace, registry=registry
+        )
+        self.durations = prometheus_client.Histogram(
+            "event_duration_seconds",
+            "Time taken by token lifecycle operations.",
+            labels,
+            namespace=namespace,
+            registry=registry,
+        )
+
+    def record(self, event: Event) -> None:
+        self.events.labels(event.name, event.outcome).inc()
+        if event.duration is not None:
+            self.durations.labels(event.name, event.outcome).observe(event.duration)
+
+
+class OpenTelemetryInstrument:
+    """Records events as OpenTelemetry spans, needs the ``otel`` extra.
+
+    Spans are named ``requests_oidc.<event>``, w/ the event's attributes, and an
+    error status when the outcome was an exception.
+
+    :param tracer: Tracer to create spans w/, the global provider's if not given.
+    """
+
+    _ok = {"ok", "hit", "revalidated", "fetched", "uncached", "pending"}
+
+    def __init__(self, tracer: Any = None) -> None:
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("requests_oidc")
+
+    def record(self, event: Event) -> None:
+        start = int(event.start * 1e9)
+        span = self.tracer.start_span(
+            f"requests_oidc.{event.name}",
+            start_time=start,
+            attributes={f"requests_oidc.{k}": v for k, v in event.attrs.items()},
+        )
+        if event.outcome not in self._ok:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, event.outcome))
+        span.end(end_time=start + int((event.duration or 0) * 1e9))
@@ -0,0 +1,180 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import requests
+
+from .flows.client_credentials import make_client_credentials_session
+from .session import ClientCredentialsSession
+from .utils import DiscoveryCache, default_cache, default_http, make_scope
+
+Key = Tuple[str, str, Tuple[str, ...], Optional[str], Optional[str], Tuple[Tuple[str, int], ...]]
+
+#: Session factory arguments that carry credentials, so belong in the key.
+AUTH_KWARGS = ("client_assertion", "dpop")
+
+
+class _Entry:
+    __slots__ = ("lock", "session", "used")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.session: Optional[ClientCredentialsSession] = None
+        self.used = time.monotonic()
+
+
+class TokenManager:
+    """Client-credentials sessions for many tenants, built once and reused.
+
+    Sessions are keyed by ``(oidc_url, client_id, scope, audience)`` & the
+    credentials they were built w/, so a rotated secret or a new
+    ``client_assertion`` gets a new session. All of them share one connection
+    pool to the IdP & one discovery cache. Sessions fetch their first token
+    lazily, and :meth:`token` only fetches when the cached one is expiring.
+
+    .. code-block:: python
+
+       manager = TokenManager(maxsize=5000, ttl=600)
+       session = manager.session(oidc_url, tenant.client_id, tenant.secret, audience="api")
+
+    Evicted sessions aren't closed, since closing one would close the shared IdP
+    pool under every other session. They're just dropped, and garbage collected once
+    callers are done w/ them.
+
+    :param maxsize: Most sessions to keep, least recently used are evicted first.
+    :param ttl: Evict sessions unused for this many seconds.
+    :param margin: Refresh tokens expiring within this many seconds, in :meth:`token`.
+    :param http: Session whose connection pool to the IdP is shared, defaults to
+      :func:`~requests_oidc.utils.http.default_http`.
+    :param discovery_cache: Cache for discovery documents.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 3600,
+        margin: float = 15,
+        http: Optional[requests.Session] = None,
+        discovery_cache: Optional[DiscoveryCache] = default_cache,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.margin = margin
+        self.http = http or default_http()
+        self.discovery_cache = discovery_cache
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        oidc_url: str,
+        client_id: str,
+        scope: Optional[List[str]] = None,
+        audience: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        **kwargs,
+    ) -> Key:
+        """The key of the session for these arguments, w/ the secret hashed, and
+        the :data:`AUTH_KWARGS` by identity.
+        """
+        secret = None
+        if client_secret is not None:
+            secret = hashlib.sha256(client_secret.encode()).hexdigest()
+        # The session holds on to them, so their ids aren't reused while it's cached
+        auth = tuple((name, id(kwargs[name])) for name in AUTH_KWARGS if name in kwargs)
+        return (oidc_url, client_id, tuple(sorted(make_scope(scope))), audience, secret, auth)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float) -> None:
+        # Entries are in use order, so the stale ones are all at the front
+        if self.ttl is not None:
+            while self._entries:
+                entry = next(iter(self._entries.values()))
+                if now - entry.used < self.ttl:
+                    break
+                self._entries.popitem(last=False)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _entry(self, key: Key) -> _Entry:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            else:
+                self._entries.move_to_end(key)
+            entry.used = now
+            self._expire(now)
+            return entry
+
+    def _session(self, entry: _Entry, *args, **kwargs) -> ClientCredentialsSession:
+        if entry.session is None:
+            entry.session = make_client_credentials_session(
+                *args, discovery_cache=self.discovery_cache, http=self.http, **kwargs
+            )
+        return entry.session
+
+    def session(
+        self,
+        oidc_url: str,
+        client_id: str,
+        client_secret: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+        audience: Optional[str] = None,
+        **kwargs,
+    ) -> ClientCredentialsSession:
+        """The session for this key, created if needed.
+
+        :param kwargs: Passed to
+          :func:`~requests_oidc.make_client_credentials_session` on creation.
+        """
+        key = self.key(oidc_url, client_id, scope, audience, client_secret, **kwargs)
+        entry = self._entry(key)
+        # Per-key lock, so concurrent first calls for one tenant fetch one token,
+        # w/o holding up the other tenants
+        with entry.lock:
+            return self._session(
+                entry, oidc_url, client_id, client_secret, scope, audience=audience, **kwargs
+            )
+
+    def token(
+        self,
+        oidc_url: str,
+        client_id: str,
+        client_secret: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+        audience: Optional[str] = None,
+        **kwargs,
+    ) -> dict:
+        """A token for this key, valid for at least ``margin`` more seconds."""
+        key = self.key(oidc_url, client_id, scope, audience, client_secret, **kwargs)
+        entry = self._entry(key)
+        with entry.lock:
+            session = self._session(
+                entry, oidc_url, client_id, client_secret, scope, audience=audience, **kwargs
+            )
+            return session.warm_up(self.margin)
+
+    def evict(
+        self,
+        oidc_url: str,
+        client_id: str,
+        scope: Optional[List[str]] = None,
+        audience: Optional[str] = None,
+    ) -> None:
+        """Drop the sessions for this key, whatever credentials they were built w/."""
+        prefix = self.key(oidc_url, client_id, scope, audience)[:4]
+        with self._lock:
+            for key in [key for key in self._entries if key[:4] == prefix]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,7 +1,29 @@
-from pathlib import Path
+import atexit
 import json
+import logging
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+from weakref import WeakSet
+
 import platformdirs
-from typing import Optional
+
+from .flows.utils import access_expired
+from .types import Plugin
+from .utils.scope import make_scope
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
 
 
 class PathPlugin:
@@ -15,7 +37,7 @@ class PathPlugin:
     def load(self) -> Optional[dict]:
         if self.noload:
             return None
-        
+
         try:
             with self.path.open() as f:
                 return json.load(f)
@@ -25,9 +47,20 @@ class PathPlugin:
     def update(self, token: dict) -> None:
         if self.nostore:
             return
-        
-        with self.path.open("w") as f:
-            json.dump(token, f)
+
+        self._write(token)
+
+    def _write(self, token: dict) -> None:
+        # Write to a sibling temp file and rename it over the target, so readers
+        # only ever see the old file or the new one, never a half-written one.
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(token, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
 
 
 class OSCachedPlugin(PathPlugin):
@@ -45,3 +78,497 @@ class OSCachedPlugin(PathPlugin):
         dir = dirs.user_cache_path
         dir.mkdir(parents=True, exist_ok=True)
         super().__init__(dir / filename, noload=noload, nostore=nostore)
+
+
+class LockingPathPlugin(PathPlugin):
+    """Same as ``PathPlugin``, but safe to share between many processes on one host.
+
+    Writes are atomic, and refreshes are serialized w/ an advisory ``fcntl`` lock on
+    ``<path>.lock``. Whoever takes the lock first refreshes, everyone queued behind
+    it picks up the token it wrote instead of refreshing again. ``load`` only
+    re-parses the file when it changes on disk, so sessions can cheaply call it
+    before every request to follow refreshes done by other processes.
+
+    POSIX only.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        noload: bool = False,
+        nostore: bool = False,
+        lock_path: Optional[Path] = None,
+    ) -> None:
+        if fcntl is None:
+            raise RuntimeError("LockingPathPlugin requires fcntl, which this platform lacks")
+
+        super().__init__(path, noload=noload, nostore=nostore)
+        self.lock_path = lock_path or path.with_name(path.name + ".lock")
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._token: Optional[dict] = None
+        # flock() only excludes other processes, threads need their own lock
+        self._thread_lock = threading.Lock()
+
+    def _stat(self) -> Tuple[int, int, int]:
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def load(self) -> Optional[dict]:
+        if self.noload:
+            return None
+
+        try:
+            stamp = self._stat()
+        except FileNotFoundError:
+            return None
+
+        if stamp != self._stamp:
+            self._token = super().load()
+            self._stamp = stamp
+
+        return self._token
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the cross-process lock for the token file."""
+        with self._thread_lock, self.lock_path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write(self, token: dict) -> None:
+        super()._write(token)
+        self._token = token
+        self._stamp = self._stat()
+
+    def update(self, token: dict) -> None:
+        # Sessions report back the token ``refresh`` already stored
+        if self.nostore or token == self._token:
+            return
+
+        with self.locked():
+            self._write(token)
+
+    def refresh(self, current: dict, fetch: Callable[[], dict]) -> dict:
+        with self.locked():
+            stored = self.load()
+            if (
+                stored is not None
+                and stored.get("access_token") != current.get("access_token")
+                and "expires_at" in stored
+                and not access_expired(stored)
+            ):
+                # Someone else refreshed while we waited on the lock
+                return stored
+
+            token = fetch()
+            if not self.nostore:
+                self._write(token)
+            return token
+
+
+class SQLiteTokenStore:
+    """Many tokens in one SQLite database, one row per credential.
+
+    Rows are keyed by ``(issuer, client_id, audience, scope)``, w/ ``scope`` stored
+    sorted so ``["a", "b"]`` and ``["b", "a"]`` address the same row. The database
+    runs in WAL mode, so readers never block the writer, or each other.
+
+    .. code-block:: python
+
+       store = SQLiteTokenStore(Path("tokens.db"))
+       session = make_client_credentials_session(
+           oidc_url, client_id, secret, plugin=store.plugin(oidc_url, client_id),
+       )
+       store.purge()
+
+    :param path: Database file, created if missing.
+    :param timeout: Seconds to wait on another process' write lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tokens (
+            issuer TEXT NOT NULL,
+            client_id TEXT NOT NULL,
+            audience TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            token TEXT NOT NULL,
+            expires_at REAL,
+            purge_after REAL,
+            PRIMARY KEY (issuer, client_id, audience, scope)
+        );
+        CREATE INDEX IF NOT EXISTS tokens_expires_at ON tokens (expires_at);
+        CREATE INDEX IF NOT EXISTS tokens_purge_after ON tokens (purge_after);
+    """
+
+    def __init__(self, path: Path, *, timeout: float = 30) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, give each its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(
+        issuer: str, client_id: str, audience: Optional[str], scope: Optional[List[str]]
+    ) -> Tuple[str, str, str, str]:
+        return (issuer, client_id, audience or "", " ".join(sorted(make_scope(scope))))
+
+    def get(
+        self,
+        issuer: str,
+        client_id: str,
+        audience: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+    ) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT token FROM tokens"
+            " WHERE issuer = ? AND client_id = ? AND audience = ? AND scope = ?",
+            self._key(issuer, client_id, audience, scope),
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(
+        self,
+        token: dict,
+        issuer: str,
+        client_id: str,
+        audience: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+    ) -> None:
+        expires_at = token.get("expires_at")
+        purge_after = expires_at
+        if expires_at is not None and "refresh_expires_in" in token:
+            purge_after = token["refresh_expires_in"] - token["expires_in"] + expires_at
+        if "offline_access" in token.get("scope", ()):
+            purge_after = None
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._key(issuer, client_id, audience, scope)
+                + (json.dumps(token), expires_at, purge_after),
+            )
+
+    def expiring(self, within: float = 0) -> List[Tuple[str, str, str, List[str]]]:
+        """Keys of rows whose access tokens expire in the next ``within`` seconds."""
+        rows = self._conn().execute(
+            "SELECT issuer, client_id, audience, scope FROM tokens WHERE expires_at < ?",
+            (time.time() + within,),
+        )
+        return [(i, c, a, s.split()) for i, c, a, s in rows]
+
+    def purge(self, before: Optional[float] = None) -> int:
+        """Delete rows that can't be refreshed anymore, returns how many were deleted.
+
+        :param before: Cutoff timestamp, defaults to now.
+        """
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM tokens WHERE purge_after < ?",
+                (time.time() if before is None else before,),
+            )
+        return cur.rowcount
+
+    def plugin(
+        self,
+        issuer: str,
+        client_id: str,
+        audience: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+        *,
+        noload: bool = False,
+        nostore: bool = False,
+    ) -> "SQLitePlugin":
+        """A plugin bound to one row of this store."""
+        return SQLitePlugin(
+            self, issuer, client_id, audience, scope, noload=noload, nostore=nostore
+        )
+
+
+class SQLitePlugin:
+    """Plugin to load / store one row of a :class:`SQLiteTokenStore`."""
+
+    def __init__(
+        self,
+        store: SQLiteTokenStore,
+        issuer: str,
+        client_id: str,
+        audience: Optional[str] = None,
+        scope: Optional[List[str]] = None,
+        *,
+        noload: bool = False,
+        nostore: bool = False,
+    ) -> None:
+        self.store = store
+        self.key = (issuer, client_id, audience, scope)
+        self.noload = noload
+        self.nostore = nostore
+
+    def load(self) -> Optional[dict]:
+        if self.noload:
+            return None
+
+        return self.store.get(*self.key)
+
+    def update(self, token: dict) -> None:
+        if self.nostore:
+            return
+
+        self.store.put(token, *self.key)
+
+
+class SharedMemoryPlugin:
+    """Plugin that keeps the token in a shared memory segment, for prefork servers.
+
+    Create it in the parent process before forking workers (ie. in gunicorn's
+    config, or uWSGI's master), and every worker reads the same segment. Reads are
+    guarded by a sequence lock rather than a mutex: ``load`` only re-parses the
+    token when the sequence number has moved, so in the common case it's a single
+    memory read, no syscalls or JSON. A refresh by any worker is visible to all the
+    others on their next request.
+
+    Writers are serialized w/ a ``multiprocessing.Lock``, which only reaches
+    processes forked from the one that created the plugin.
+
+    :param name: Name of the segment, generated if not given. Other processes can
+      attach to it w/ ``create=False``.
+    :param size: Bytes available for the JSON-encoded token.
+    :param create: Create the segment, rather than attach to an existing one.
+    """
+
+    _HEADER = struct.Struct("<QI")
+    _SEQ = struct.Struct("<Q")
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        *,
+        size: int = 16384,
+        create: bool = True,
+        noload: bool = False,
+        nostore: bool = False,
+    ) -> None:
+        import multiprocessing
+        from multiprocessing import resource_tracker, shared_memory
+
+        self.noload = noload
+        self.nostore = nostore
+        self.size = size
+        # Forked workers inherit the plugin, only the process that created the
+        # segment should unlink it
+        self._owner = os.getpid() if create else None
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=create, size=self._HEADER.size + size if create else 0
+        )
+        if not create:
+            # Only the creator should unlink the segment when it exits
+            resource_tracker.unregister(self._shm._name, "shared_memory")  # type: ignore
+
+        buf = self._shm.buf
+        assert buf is not None
+        self._buf = buf
+        self.name = self._shm.name
+        self._write_lock = multiprocessing.Lock()
+        self._seq = 0
+        self._token: Optional[dict] = None
+
+    def load(self) -> Optional[dict]:
+        if self.noload:
+            return None
+
+        buf = self._buf
+        while True:
+            (seq,) = self._SEQ.unpack_from(buf)
+            if seq == self._seq:
+                return self._token
+            if seq & 1:
+                # A writer is mid-update
+                time.sleep(0)
+                continue
+
+            _, length = self._HEADER.unpack_from(buf)
+            data = bytes(buf[self._HEADER.size : self._HEADER.size + length])
+            if self._SEQ.unpack_from(buf)[0] == seq:
+                break
+
+        self._token = json.loads(data) if length else None
+        self._seq = seq
+        return self._token
+
+    def _write(self, token: dict) -> None:
+        data = json.dumps(token).encode()
+        if len(data) > self.size:
+            raise ValueError(f"Token is {len(data)} bytes, segment only holds {self.size}")
+
+        buf = self._buf
+        (seq,) = self._SEQ.unpack_from(buf)
+        self._SEQ.pack_into(buf, 0, seq + 1)
+        buf[self._HEADER.size : self._HEADER.size + len(data)] = data
+        self._HEADER.pack_into(buf, 0, seq + 1, len(data))
+        self._SEQ.pack_into(buf, 0, seq + 2)
+
+        self._token = token
+        self._seq = seq + 2
+
+    def update(self, token: dict) -> None:
+        # Sessions report back the token ``refresh`` already stored
+        if self.nostore or token == self._token:
+            return
+
+        with self._write_lock:
+            self._write(token)
+
+    def refresh(self, current: dict, fetch: Callable[[], dict]) -> dict:
+        with self._write_lock:
+            stored = self.load()
+            if (
+                stored is not None
+                and stored.get("access_token") != current.get("access_token")
+                and "expires_at" in stored
+                and not access_expired(stored)
+            ):
+                # Another worker refreshed while we waited on the lock
+                return stored
+
+            token = fetch()
+            if not self.nostore:
+                self._write(token)
+            return token
+
+    def close(self) -> None:
+        """Detach from the segment, destroying it if this process created it."""
+        self._buf.release()
+        self._shm.close()
+        if self._owner == os.getpid():
+            self._shm.unlink()
+
+
+class WriteBehindPlugin:
+    """Wraps a plugin so ``update`` returns right away, and a background thread
+    stores the token.
+
+    Refreshes stop waiting on the wrapped plugin's storage (ie.
+    :class:`PathPlugin`'s JSON dump & file write). When updates come in faster
+    than they're written, only the latest token is, ``coalesced`` counts the ones
+    skipped. ``load`` returns a token still waiting to be written, if there's one.
+
+    Tokens waiting to be written are flushed when the interpreter exits. A process
+    killed outright loses them, and so logs in again / fetches a new token next
+    time, as if it never refreshed.
+
+    Don't wrap a :class:`~requests_oidc.types.SharedPlugin`, sessions would lose
+    its cross-process refresh coordination.
+
+    :param plugin: Plugin to store tokens w/.
+    :param delay: Seconds to wait after an update before writing, so a burst of
+      them is written once.
+    """
+
+    _live: "WeakSet[WriteBehindPlugin]" = WeakSet()
+
+    def __init__(self, plugin: Plugin, *, delay: float = 0) -> None:
+        self.plugin = plugin
+        self.delay = delay
+        self.coalesced = 0
+        self._pending: Optional[dict] = None
+        self._writing = False
+        self._hurry = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._live.add(self)
+
+    def load(self) -> Optional[dict]:
+        with self._cond:
+            if self._pending is not None:
+                return self._pending
+        return self.plugin.load()
+
+    def update(self, token: dict) -> None:
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = token
+            # Also restarts the writer in a forked child, where it didn't survive
+            if not self._alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="requests-oidc-write-behind", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _store(self, token: dict) -> None:
+        try:
+            self.plugin.update(token)
+        except Exception:
+            log.warning("Failed to store token w/ %r", self.plugin, exc_info=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                deadline = time.monotonic() + self.delay
+                while not self._hurry and not self._closed and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                token, self._pending = self._pending, None
+                self._hurry = False
+                self._writing = True
+
+            self._store(token)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write the waiting token now, returns whether it was written in time."""
+        with self._cond:
+            if self._alive():
+                self._hurry = self._pending is not None
+                self._cond.notify_all()
+                return self._cond.wait_for(
+                    lambda: self._pending is None and not self._writing, timeout
+                )
+            token, self._pending = self._pending, None
+
+        if token is not None:
+            self._store(token)
+        return True
+
+    def close(self) -> None:
+        """Flush, and stop the background thread."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._live.discard(self)
+
+
+@atexit.register
+def _flush_write_behind() -> None:
+    # Daemon threads are still running while atexit hooks are
+    for plugin in list(WriteBehindPlugin._live):
+        plugin.flush(timeout=5)
@@ -0,0 +1,82 @@
+import threading
+from typing import Callable, Optional
+
+import requests
+
+from .session import OIDCSession, TokenSnapshot
+from .utils import make_http_session, share_pool
+
+
+class _SnapshotAuth(requests.auth.AuthBase):
+    def __init__(self, pool: "SessionPool") -> None:
+        self.pool = pool
+
+    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        request.headers["Authorization"] = self.pool.snapshot().header
+        return request
+
+
+class SessionPool:
+    """``requests`` sessions for many threads, all authenticated w/ one token.
+
+    One session is built w/ ``factory``, so discovery & the plugin load happen
+    once. Each thread then gets its own plain ``requests.Session`` from
+    :meth:`session`, so cookies & settings aren't shared between threads. Its
+    requests read the token from an immutable
+    :class:`~requests_oidc.session.TokenSnapshot`, which a refresh replaces in
+    one assignment, so they take no lock until it expires. Then one thread
+    refreshes, through the factory's session & its single-flight, and the rest
+    wait on it.
+
+    All sessions, the factory's included, share one connection pool, keeping up
+    to ``workers`` connections open per host.
+
+    .. code-block:: python
+
+       pool = SessionPool(
+           functools.partial(make_client_credentials_session, oidc_url, client_id, secret),
+           workers=256,
+       )
+
+       def handle(job):
+           pool.session().post(api_url, json=job).raise_for_status()
+
+    DPoP sessions can't be pooled, their proofs are per request.
+
+    :param factory: Session factory, ie. a partial of
+      :func:`~requests_oidc.make_client_credentials_session`. It's called w/ the
+      pool's ``http`` as ``http``.
+    :param workers: Threads expected to use the pool at once.
+    :param hosts: Hosts to keep connection pools for.
+    """
+
+    def __init__(
+        self, factory: Callable[..., OIDCSession], *, workers: int = 10, hosts: int = 10
+    ) -> None:
+        self.http = make_http_session(pool_connections=hosts, pool_maxsize=workers)
+        self.source = factory(http=self.http)
+        if self.source.dpop is not None:
+            raise ValueError("Sessions w/ DPoP can't be pooled")
+        self._auth = _SnapshotAuth(self)
+        self._local = threading.local()
+
+    def snapshot(self) -> TokenSnapshot:
+        """The current token, refreshed first if it's expired."""
+        return self.source.snapshot()
+
+    def session(self) -> requests.Session:
+        """The calling thread's session, created on its first call."""
+        session: Optional[requests.Session] = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.auth = self._auth
+            share_pool(session, self.http)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Make a request w/ the calling thread's session."""
+        return self.session().request(method, url, **kwargs)
+
+    def close(self) -> None:
+        """Close every connection in the pool."""
+        self.http.close()
@@ -0,0 +1,141 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import requests
+from requests_oauthlib import OAuth2Session  # type: ignore
+
+import requests_oidc as flows
+
+from .session import ClientCredentialsSession
+from .utils import DiscoveryCache, default_cache, default_http
+from .utils.discovery import CacheEntry
+
+#: Session factory for each ``flow`` of a spec.
+FLOWS = {
+    "auth_code": "make_auth_code_session",
+    "device_code": "make_device_code_session",
+    "client_credentials": "make_client_credentials_session",
+    "token": "make_token_session",
+}
+
+
+@dataclass
+class Prefetched:
+    """What :func:`prefetch` got, in the same order as the specs it was given."""
+
+    #: Ready sessions, ``None`` where the spec failed.
+    sessions: List[Optional[OAuth2Session]] = field(default_factory=list)
+    #: Exceptions, by index of the spec that raised them.
+    errors: Dict[int, BaseException] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _discover(oidc_url: str, cache: Optional[DiscoveryCache], http: requests.Session) -> dict:
+    if cache is not None:
+        return cache.fetch(oidc_url, http)
+
+    res = http.get(oidc_url)
+    res.raise_for_status()
+    return res.json()
+
+
+def _check(spec: Mapping) -> None:
+    if spec.get("flow") not in FLOWS:
+        raise ValueError(f"Spec needs a flow, one of {', '.join(FLOWS)}, got {spec.get('flow')!r}")
+    if "oidc_url" not in spec:
+        raise ValueError("Spec needs an oidc_url")
+
+
+def _acquire(
+    spec: Mapping, cache: DiscoveryCache, http: requests.Session, margin: float
+) -> OAuth2Session:
+    spec = dict(spec)
+    factory = getattr(flows, FLOWS[spec.pop("flow")])
+    session = factory(discovery_cache=cache, http=http, **spec)
+    if isinstance(session, ClientCredentialsSession):
+        session.warm_up(margin)
+    return session
+
+
+def prefetch(
+    specs: Iterable[Mapping],
+    *,
+    max_workers: int = 8,
+    discovery_cache: Optional[DiscoveryCache] = default_cache,
+    http: Optional[requests.Session] = None,
+    margin: float = 15,
+) -> Prefetched:
+    """Build many sessions at once, w/ their tokens ready to use.
+
+    Each spec is the keyword arguments of a session factory, plus the ``flow`` to
+    use (one of ``auth_code``, ``device_code``, ``client_credentials``, ``token``).
+    Discovery runs once per ``oidc_url``, then every session is built concurrently,
+    so readiness takes about as long as the slowest spec, not all of them summed.
+
+    .. code-block:: python
+
+       result = prefetch(
+           [
+               {"flow": "client_credentials", "oidc_url": url, "client_id": c, "client_secret": s}
+               for c, s in credentials
+           ],
+           http=make_http_session(pool_maxsize=8),
+       )
+       if not result.ok:
+           log.warning("Failed to warm up: %s", result.errors)
+
+    Failing specs don't stop the others, their exceptions are in ``errors``. So are
+    malformed ones, ie. w/o an ``oidc_url``, as a ``ValueError``.
+
+    :param max_workers: Threads to run discovery & token requests on. Give ``http``
+      a pool at least this big, or connections get thrown away.
+    :param discovery_cache: Cache to discover through, each document is fetched
+      at most once per call regardless.
+    :param http: Session whose connection pool to the IdP every session shares.
+    :param margin: Client credentials sessions fetch a token unless theirs is good
+      for this many more seconds.
+    """
+    specs = list(specs)
+    http = http or default_http()
+    result = Prefetched(sessions=[None] * len(specs))
+
+    # Factories discover through this, so they all get the document fetched below
+    pinned = DiscoveryCache()
+    valid = {}
+    for i, spec in enumerate(specs):
+        try:
+            _check(spec)
+        except ValueError as e:
+            result.errors[i] = e
+        else:
+            valid[i] = spec
+
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="requests-oidc-prefetch") as pool:
+        urls = {spec["oidc_url"] for spec in valid.values()}
+        discovering = {url: pool.submit(_discover, url, discovery_cache, http) for url in urls}
+        failed: Dict[str, BaseException] = {}
+        for url, future in discovering.items():
+            try:
+                pinned.put(url, CacheEntry(data=future.result(), expires_at=math.inf))
+            except Exception as e:
+                failed[url] = e
+
+        acquiring = {}
+        for i, spec in valid.items():
+            if spec["oidc_url"] in failed:
+                result.errors[i] = failed[spec["oidc_url"]]
+            else:
+                acquiring[i] = pool.submit(_acquire, spec, pinned, http, margin)
+
+        for i, future in acquiring.items():
+            try:
+                result.sessions[i] = future.result()
+            except Exception as e:
+                result.errors[i] = e
+
+    return result
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from requests_oauthlib import OAuth2Session  # type: ignore
+
+log = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """Refreshes any number of sessions shortly before their access tokens expire.
+
+    One thread, one heap of deadlines. Deadlines are computed from each token's
+    ``expires_at`` after every refresh, so time spent talking to the IdP doesn't
+    accumulate as drift.
+
+    .. code-block:: python
+
+       scheduler = RefreshScheduler(margin=30, jitter=10)
+       scheduler.register(session_a)
+       scheduler.register(session_b)
+       scheduler.start()
+
+    :param margin: Refresh this many seconds before expiry.
+    :param jitter: Refresh up to this many extra seconds early, chosen at random per
+      refresh, so a fleet started together doesn't refresh in lockstep.
+    Tokens that don't expire, ie. w/o ``expires_at`` or ``expires_in``, are left
+    alone.
+
+    :param retry: Seconds to wait before retrying a failed refresh, and the least
+      time between two refreshes of a session, for tokens living shorter than
+      ``margin``.
+    """
+
+    def __init__(self, margin: float = 15, jitter: float = 5, retry: float = 5) -> None:
+        self.margin = margin
+        self.jitter = jitter
+        self.retry = retry
+        self._heap: List[Tuple[float, int, "OAuth2Session"]] = []
+        # Maps id(session) -> seq of its live heap entry, anything else is stale
+        self._live: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def _deadline(self, token: dict) -> Optional[float]:
+        if "expires_at" in token:
+            remaining = token["expires_at"] - time.time()
+        elif "expires_in" in token:
+            remaining = token["expires_in"]
+        else:
+            return None
+
+        remaining -= self.margin + random.uniform(0, self.jitter)
+        return time.monotonic() + max(remaining, 0)
+
+    def _push(self, session: "OAuth2Session", deadline: float) -> None:
+        seq = next(self._seq)
+        self._live[id(session)] = seq
+        heapq.heappush(self._heap, (deadline, seq, session))
+        self._cond.notify()
+
+    def register(self, session: "OAuth2Session") -> None:
+        """Start keeping ``session``'s token fresh."""
+        deadline = self._deadline(session.token)
+        if deadline is None:
+            log.debug("Not scheduling %s, its token doesn't expire", session.auto_refresh_url)
+            return
+        with self._cond:
+            self._push(session, deadline)
+
+    def unregister(self, session: "OAuth2Session") -> None:
+        with self._cond:
+            self._live.pop(id(session), None)
+
+    def _refresh(self, session: "OAuth2Session") -> Optional[float]:
+        # Deferred, the scheduler doesn't pull in requests_oauthlib by itself
+        from .session import renew
+
+        try:
+            token = renew(session)
+        except Exception:
+            log.exception("Failed to refresh token from %s", session.auto_refresh_url)
+            return time.monotonic() + self.retry
+
+        deadline = self._deadline(token)
+        if deadline is None:
+            return None
+        return max(deadline, time.monotonic() + self.retry)
+
+    def run_forever(self) -> None:
+        """Refresh tokens on the current thread, until :meth:`stop` is called."""
+        with self._cond:
+            while not self._stopping:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                deadline, seq, session = self._heap[0]
+                if self._live.get(id(session)) != seq:
+                    heapq.heappop(self._heap)
+                    continue
+
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                heapq.heappop(self._heap)
+                # Don't hold the lock while talking to the IdP
+                self._cond.release()
+                try:
+                    renewed = self._refresh(session)
+                finally:
+                    self._cond.acquire()
+
+                if self._live.get(id(session)) != seq:
+                    continue
+                if renewed is None:
+                    del self._live[id(session)]
+                else:
+                    self._push(session, renewed)
+
+    def start(self) -> None:
+        """Refresh tokens on a background daemon thread."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self.run_forever, name="requests-oidc-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self) -> "RefreshScheduler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,432 @@
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+import requests
+from oauthlib.common import urldecode
+from oauthlib.oauth2 import TokenExpiredError
+from requests_oauthlib import OAuth2Session  # type: ignore
+
+from .instrumentation import event, plugin_load, span
+from .types import Plugin, SharedPlugin
+from .utils import Resilience, SingleFlight
+from .utils.resilience import unavailable
+
+if TYPE_CHECKING:
+    from .utils.assertion import ClientAssertion
+    from .utils.clock import ClockSkew
+    from .utils.dpop import DPoP
+    from .utils.jwks import TokenValidator
+
+log = logging.getLogger(__name__)
+
+
+def _raise_for_unavailable(res):
+    # oauthlib would try to parse an outage's error page as a token response
+    if unavailable(res.status_code):
+        res.raise_for_status()
+    return res
+
+
+def _replayable(res: requests.Response) -> bool:
+    # A 401 means the request wasn't acted on, so sending it again is safe, as
+    # long as its body wasn't a stream we've already used up
+    body = res.request.body
+    if body is not None and not isinstance(body, (bytes, str)):
+        return False
+    return "invalid_token" in res.headers.get("WWW-Authenticate", "")
+
+
+def renew(session: OAuth2Session) -> dict:
+    """Refresh ``session``'s token and hand it to its ``token_updater``, as a
+    request that finds it expired does.
+    """
+    if not session.auto_refresh_url:
+        raise TokenExpiredError()
+    # requests_oauthlib is very bad, why isn't this kicked off from .refresh_token?
+    token = session.refresh_token(session.auto_refresh_url)
+    if session.token_updater:
+        session.token_updater(token)
+    return token
+
+
+class TokenSnapshot:
+    """An access token, w/ its ``Authorization`` header rendered, and its expiry as
+    a :func:`time.monotonic` deadline. Immutable, a new token is a new snapshot.
+    """
+
+    __slots__ = ("access_token", "header", "deadline")
+
+    access_token: Optional[str]
+    header: str
+    deadline: float
+
+    def __init__(self, access_token: Optional[str], deadline: float) -> None:
+        object.__setattr__(self, "access_token", access_token)
+        object.__setattr__(self, "header", f"Bearer {access_token}")
+        object.__setattr__(self, "deadline", deadline)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("TokenSnapshot is immutable")
+
+    @classmethod
+    def of(cls, token: dict) -> "TokenSnapshot":
+        access_token = token.get("access_token")
+        if not access_token:
+            return cls(None, -math.inf)
+
+        expires_at = token.get("expires_at")
+        if expires_at is None:
+            return cls(access_token, math.inf)
+        # Immune to the wall clock being stepped while the token is in use
+        return cls(access_token, time.monotonic() + expires_at - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+class OIDCSession(OAuth2Session):
+    """``OAuth2Session`` that keeps its token in step w/ the plugin storing it.
+
+    Refreshes go through a :class:`~requests_oidc.utils.SingleFlight`, so when many
+    threads find the token expired at once, only one of them calls the token
+    endpoint and the rest wait for its result. ``token_updater`` is called once
+    per new token, not once per waiting thread.
+
+    When the plugin is a :class:`~requests_oidc.types.SharedPlugin` (ie.
+    :class:`~requests_oidc.plugins.LockingPathPlugin`), the session also follows
+    tokens refreshed by other processes, and lets the plugin decide who gets to
+    refresh.
+
+    :param plugin: Plugin the session's token is loaded from / stored to.
+    :param refresh_coordinator: Coordinator to refresh through, pass the same one
+      to several sessions to coalesce refreshes across all of them.
+      ``refresh_coordinator.coalesced`` counts refreshes that piggy-backed on another.
+    :param validator: Validates refreshed tokens against the IdP's signing keys,
+      see :class:`~requests_oidc.utils.jwks.TokenValidator`.
+    :param resilience: Retry, circuit breaking & serve-stale policy for calls to
+      the token endpoint, see :class:`~requests_oidc.utils.resilience.Resilience`.
+    :param client_assertion: Authenticates the client w/ a signed JWT when
+      refreshing, see :class:`~requests_oidc.utils.assertion.ClientAssertion`.
+    :param dpop: Binds tokens to a key pair, adding proofs to requests to the
+      token endpoint and requests w/ the token, see
+      :class:`~requests_oidc.utils.dpop.DPoP`.
+    :param fast: Skip oauthlib when adding the token to requests. Each request
+      then only compares a :class:`TokenSnapshot`'s deadline to the clock and sets
+      its header, but ``protected_request`` compliance hooks aren't run. Has no
+      effect w/ a shared plugin, ``dpop`` or serve-stale, which need the full path.
+    :param clock_skew: Estimates the IdP's clock offset from token responses'
+      ``Date`` headers, and has ``validator`` put the expiry of JWT access tokens
+      on the local clock w/ it, see :class:`~requests_oidc.utils.clock.ClockSkew`.
+      W/o a ``validator`` (ie. ``validate=True`` in the factories) it corrects
+      nothing: expiry then comes from ``expires_in``, which is on the local clock
+      already.
+    :param retry_unauthorized: When a request w/ the token still gets a ``401``
+      w/ ``invalid_token`` (ie. it was revoked, or a skewed clock made it look
+      live), refresh the token and send the request again, once. Concurrent
+      rejections of the same token share one refresh. Requests w/ streamed bodies
+      aren't retried.
+    """
+
+    def __init__(
+        self,
+        *args,
+        plugin: Optional[Plugin] = None,
+        refresh_coordinator: Optional[SingleFlight] = None,
+        validator: Optional["TokenValidator"] = None,
+        resilience: Optional[Resilience] = None,
+        client_assertion: Optional["ClientAssertion"] = None,
+        dpop: Optional["DPoP"] = None,
+        fast: bool = False,
+        clock_skew: Optional["ClockSkew"] = None,
+        retry_unauthorized: bool = False,
+        **kwargs,
+    ) -> None:
+        self._last_updated: Optional[dict] = None
+        self.dpop = dpop
+        super().__init__(*args, **kwargs)
+        self.plugin = plugin
+        self._shared = isinstance(plugin, SharedPlugin)
+        self.refresh_coordinator = refresh_coordinator or SingleFlight()
+        self.validator = validator
+        self.resilience = resilience or Resilience()
+        self.client_assertion = client_assertion
+        self._background: Optional[threading.Thread] = None
+        self._background_lock = threading.Lock()
+        self._rejected_lock = threading.Lock()
+        self.register_compliance_hook("access_token_response", _raise_for_unavailable)
+        self.register_compliance_hook("refresh_token_response", _raise_for_unavailable)
+        self._fast = fast and not self._shared and dpop is None and not self.resilience.serve_stale
+        self.clock_skew = clock_skew
+        self.retry_unauthorized = retry_unauthorized
+        if clock_skew is not None:
+            self.register_compliance_hook("access_token_response", self._observe_clock)
+            self.register_compliance_hook("refresh_token_response", self._observe_clock)
+            if validator is not None and validator.clock_skew is None:
+                validator.clock_skew = clock_skew
+
+    @property
+    def token(self) -> dict:
+        return OAuth2Session.token.fget(self)
+
+    @token.setter
+    def token(self, value: dict) -> None:
+        OAuth2Session.token.fset(self, value)
+        self._snapshot = TokenSnapshot.of(value)
+        # oauthlib refuses token types it doesn't know. DPoP tokens go out like
+        # Bearer ones, then send() relabels them & adds the proof
+        if self._client.token_type.lower() == "dpop":
+            self._client.token_type = "Bearer"
+
+    @property
+    def token_updater(self) -> Optional[Callable[[dict], None]]:
+        if self._token_updater is None:
+            return None
+        return self._update_token
+
+    @token_updater.setter
+    def token_updater(self, value: Optional[Callable[[dict], None]]) -> None:
+        self._token_updater = value
+
+    def _update_token(self, token: dict) -> None:
+        # Every thread that waited on a refresh reports the same token back
+        if token is self._last_updated:
+            return
+        self._last_updated = token
+        if self._token_updater is not None:
+            self._token_updater(token)
+
+    def _observe_clock(self, res: requests.Response) -> requests.Response:
+        assert self.clock_skew is not None
+        self.clock_skew.observe(res)
+        return res
+
+    def request(self, method, url, *args, **kwargs):
+        res = self._request(method, url, *args, **kwargs)
+        if res.status_code != 401:
+            return res
+
+        event("unauthorized", url=url)
+        if (
+            self.retry_unauthorized
+            and self.auto_refresh_url
+            and not kwargs.get("withhold_token")
+            and _replayable(res)
+        ):
+            self._refresh_rejected(res)
+            res.close()
+            res = self._request(method, url, *args, **kwargs)
+            if res.status_code == 401:
+                event("unauthorized", url=url)
+        return res
+
+    def _refresh_rejected(self, res: requests.Response) -> None:
+        rejected = res.request.headers.get("Authorization", "").partition(" ")[2]
+        # Threads rejected w/ the same token queue up here, the first refreshes,
+        # the rest find it replaced
+        with self._rejected_lock:
+            if rejected and rejected != self.access_token:
+                return
+            # It may be the result of a refresh that only just finished
+            self.refresh_coordinator.expire()
+            self.renew()
+
+    def _request(self, method, url, *args, **kwargs):
+        if self._fast and not args and not kwargs.get("withhold_token"):
+            return self._fast_request(method, url, **kwargs)
+
+        if self._shared and self.token and not kwargs.get("withhold_token"):
+            token = plugin_load(self.plugin)
+            if token is not None and token.get("access_token") != self.access_token:
+                self.token = token
+
+        if self.resilience.serve_stale and not kwargs.get("withhold_token"):
+            # Refresh ahead of expiry, w/o making this request wait on the IdP
+            expires_at = self.token.get("expires_at")
+            remaining = None if expires_at is None else expires_at - time.time()
+            if remaining is not None and 0 < remaining <= self.resilience.serve_stale:
+                self._refresh_in_background()
+
+        return super().request(method, url, *args, **kwargs)
+
+    def snapshot(self) -> TokenSnapshot:
+        """The current token as a :class:`TokenSnapshot`, renewed first if it's
+        expired. Safe to call from any thread.
+        """
+        snapshot = self._snapshot
+        if time.monotonic() >= snapshot.deadline:
+            snapshot = self._renew(snapshot)
+        return snapshot
+
+    def _fast_request(self, method, url, headers=None, **kwargs):
+        snapshot = self.snapshot()
+        if headers is None:
+            headers = {"Authorization": snapshot.header}
+        else:
+            headers = {**headers, "Authorization": snapshot.header}
+        for oauth_only in ("withhold_token", "client_id", "client_secret"):
+            kwargs.pop(oauth_only, None)
+
+        return requests.Session.request(self, method, url, headers=headers, **kwargs)
+
+    def _renew(self, seen: TokenSnapshot) -> TokenSnapshot:
+        # Another thread may have renewed it since we looked
+        if self._snapshot is seen:
+            self.renew()
+        return self._snapshot
+
+    def renew(self) -> dict:
+        """Refresh the token and hand it to ``token_updater``, see :func:`renew`."""
+        return renew(self)
+
+    def send(self, request, **kwargs):
+        dpop = self.dpop
+        if dpop is None:
+            return super().send(request, **kwargs)
+
+        self._prove(request, dpop)
+        res = super().send(request, **kwargs)
+        if dpop.observe(res):
+            self._prove(request, dpop)
+            res = super().send(request, **kwargs)
+        return res
+
+    def _prove(self, request: requests.PreparedRequest, dpop: "DPoP") -> None:
+        method, url = request.method, request.url
+        assert method is not None and url is not None, "Only prepared requests are sent"
+
+        authorization = request.headers.get("Authorization", "")
+        if isinstance(authorization, bytes):
+            authorization = authorization.decode("latin-1")
+        scheme, _, access_token = authorization.partition(" ")
+        if scheme in ("Bearer", "DPoP") and access_token and access_token == self.access_token:
+            request.headers.update(dpop.headers(method, url, access_token))
+        elif url.split("?")[0] == self.auto_refresh_url:
+            request.headers["DPoP"] = dpop.proof(method, url)
+
+    def fetch_token(self, token_url, *args, **kwargs) -> dict:
+        with span("token.fetch", url=token_url):
+            return super().fetch_token(token_url, *args, **kwargs)
+
+    def _fetch(self, token_url, *args, **kwargs) -> dict:
+        """Get a new token from the IdP, w/o any coordination."""
+        if self.client_assertion is not None:
+            kwargs.update(self.client_assertion.params(token_url))
+        return super().refresh_token(token_url, *args, **kwargs)
+
+    def _refresh_in_background(self) -> None:
+        with self._background_lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(
+                target=self._background_refresh, name="requests-oidc-refresh-ahead", daemon=True
+            )
+            self._background.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.renew()
+        except Exception:
+            log.warning(
+                "Failed to refresh token from %s, using the current one until it expires",
+                self.auto_refresh_url,
+                exc_info=True,
+            )
+
+    def refresh_token(self, token_url, *args, **kwargs) -> dict:
+        # Threads that found the same token expired, but only got here after
+        # another one refreshed it, get that refresh's token
+        seen = self._snapshot
+
+        def fetch() -> dict:
+            with span("token.refresh", url=token_url):
+                token = self.resilience.call(
+                    token_url, lambda: self._fetch(token_url, *args, **kwargs)
+                )
+            if self.validator is not None:
+                # Re-set, so oauthlib picks up the expiry from the token's claims
+                self.token = self.validator.apply(token)
+            return self.token
+
+        def refresh() -> dict:
+            if self._snapshot is not seen:
+                return self.token
+            if not isinstance(self.plugin, SharedPlugin):
+                return fetch()
+
+            self.token = self.plugin.refresh(self.token, fetch)
+            return self.token
+
+        return self.refresh_coordinator.run(refresh)
+
+
+class ClientCredentialsSession(OIDCSession):
+    """``OIDCSession`` for the client credentials grant.
+
+    The grant has no refresh tokens, so refreshing fetches a new token w/ the
+    client's credentials, through the same single-flight / plugin coordination as
+    any other refresh. Unless it's given a token, the session fetches its first
+    one on its first request, or on :meth:`warm_up`.
+
+    :param client_secret: The client's secret, sent w/ HTTP basic auth. Not needed
+      when authenticating w/ ``client_assertion``.
+    :param grant_kwargs: Extra parameters for the token request, ie. ``audience``.
+    """
+
+    def __init__(
+        self,
+        *args,
+        client_secret: Optional[str] = None,
+        grant_kwargs: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.client_secret = client_secret
+        self.grant_kwargs = grant_kwargs or {}
+
+    def _fetch(self, token_url, *args, **kwargs) -> dict:
+        # Not fetch_token, it blanks the session's token while waiting on the IdP,
+        # so concurrent requests would go out w/o one
+        auth = None
+        grant_kwargs = self.grant_kwargs
+        if self.client_assertion is not None:
+            params = self.client_assertion.params(token_url)
+            grant_kwargs = {**grant_kwargs, **params, "include_client_id": True}
+        elif self.client_secret is not None:
+            auth = requests.auth.HTTPBasicAuth(self.client_id, self.client_secret)
+        else:
+            raise ValueError("Give one of client_secret or client_assertion")
+
+        body = self._client.prepare_request_body(scope=self.scope, **grant_kwargs)
+        res = self.post(
+            token_url,
+            data=dict(urldecode(body)),
+            auth=auth,
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/x-www-form-urlencoded;charset=UTF-8",
+            },
+            withhold_token=True,
+        )
+        for hook in self.compliance_hook["access_token_response"]:
+            res = hook(res)
+
+        self.token = self._client.parse_request_body_response(res.text, scope=self.scope)
+        return self.token
+
+    def warm_up(self, margin: float = 0) -> dict:
+        """Fetch a token now, unless the session has one good for ``margin`` more seconds."""
+        expires_at = self.token.get("expires_at")
+        if self.access_token and (expires_at is None or time.time() < expires_at - margin):
+            return self.token
+
+        return self.renew()
+
+    def request(self, method, url, *args, **kwargs):
+        if not self.access_token and not kwargs.get("withhold_token"):
+            self.warm_up()
+
+        return super().request(method, url, *args, **kwargs)
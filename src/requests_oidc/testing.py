@@ -0,0 +1,404 @@
+"""A stand-in OIDC provider on localhost, for tests and benchmarks.
+
+.. code-block:: python
+
+   with FakeIdP(latency=0.02) as idp:
+       session = make_client_credentials_session(idp.oidc_url, "client", "secret")
+       session.get(idp.api_url).raise_for_status()
+
+It implements discovery, the token endpoint (``client_credentials``,
+``refresh_token``, ``authorization_code``, device code & token exchange grants),
+device authorization, an authorization endpoint that approves immediately, and a
+protected ``/api`` endpoint that answers ``401`` to unknown or expired tokens.
+Requests w/ a DPoP proof get tokens bound to the proof's key. Proofs' claims are
+checked, but nothing is verified beyond that (signatures included), don't point
+anything real at it.
+"""
+import base64
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers & body go out in separate writes, don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def _reply(
+        self, status: int, body: Optional[dict] = None, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_qs(self.rfile.read(length).decode())
+        return {k: " ".join(v) for k, v in fields.items()}
+
+    def _dispatch(self, method: str) -> None:
+        idp = self.server.idp
+        url = urlsplit(self.path)
+        endpoint = url.path.strip("/")
+
+        # Always drain the body, or it's read as the next request on the connection
+        form = self._form() if method == "post" else {}
+
+        idp.hits[endpoint] += 1
+        if idp.latency:
+            time.sleep(idp.latency)
+
+        status = idp._injected_failure(endpoint)
+        if status is not None:
+            error = "temporarily_unavailable" if status >= 500 else "invalid_request"
+            self._reply(status, {"error": error})
+            return
+
+        name = endpoint.translate(str.maketrans("-/.", "___"))
+        handler = getattr(idp, f"_{method}_{name}", None)
+        if handler is None:
+            self._reply(404, {"error": "not_found"})
+            return
+
+        if method == "post":
+            self._reply(*handler(form, self.headers))
+        else:
+            self._reply(*handler(parse_qs(url.query), self.headers))
+
+    def do_GET(self) -> None:
+        self._dispatch("get")
+
+    def do_POST(self) -> None:
+        self._dispatch("post")
+
+    # Disable logging from the HTTP Server
+    def log_message(self, format, *args):
+        return
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once, the default backlog of 5 drops them
+    request_queue_size = 128
+    idp: "FakeIdP"
+
+
+Reply = Tuple[int, Optional[dict], Dict[str, str]]
+
+
+class FakeIdP:
+    """A fake OIDC provider, served from a background thread.
+
+    :param latency: Seconds every request is delayed by.
+    :param expires_in: Lifetime of access tokens.
+    :param refresh_expires_in: Lifetime of refresh tokens.
+    :param rotate_refresh_tokens: Issue a new refresh token on every refresh, and
+      reject the one that was used, like a strict rotating IdP would.
+    :param device_interval: Polling interval handed out by device authorization.
+    :param device_approve_after: Polls answered w/ ``authorization_pending`` before
+      a device code is approved.
+    :param discovery_max_age: ``Cache-Control: max-age`` on the discovery document.
+    :param dpop_nonce: Make DPoP proofs carry a server-provided nonce, handed out
+      w/ ``use_dpop_nonce`` errors.
+    :param clients: Secrets by client id. ``client_credentials`` grants must give
+      one of them, w/ Basic auth or in the form, or a ``client_assertion``, and
+      are answered ``invalid_client`` otherwise. Without it, any client id w/ a
+      non-empty secret is accepted.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        expires_in: int = 300,
+        refresh_expires_in: int = 1800,
+        rotate_refresh_tokens: bool = True,
+        device_interval: float = 0,
+        device_approve_after: int = 1,
+        discovery_max_age: int = 0,
+        dpop_nonce: bool = False,
+        clients: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.latency = latency
+        self.expires_in = expires_in
+        self.refresh_expires_in = refresh_expires_in
+        self.rotate_refresh_tokens = rotate_refresh_tokens
+        self.device_interval = device_interval
+        self.device_approve_after = device_approve_after
+        self.discovery_max_age = discovery_max_age
+        self.dpop_nonce = secrets.token_urlsafe(8) if dpop_nonce else None
+        self.clients = clients
+
+        #: Requests received, by endpoint.
+        self.hits: Counter = Counter()
+        #: ``client_assertion`` of each token request that had one, unverified.
+        self.assertions: List[str] = []
+        #: Claims of each DPoP proof accepted.
+        self.dpop_proofs: List[dict] = []
+        self._lock = threading.Lock()
+        self._access: Dict[str, float] = {}
+        self._refresh: Dict[str, List[str]] = {}
+        # Key thumbprints of DPoP-bound access & refresh tokens
+        self._bound: Dict[str, str] = {}
+        self._codes: Dict[str, List[str]] = {}
+        self._devices: Dict[str, int] = {}
+        self._failures: Dict[str, List[int]] = {}
+        self._server: Optional[_Server] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "FakeIdP isn't running"
+        host, port = self._server.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    @property
+    def oidc_url(self) -> str:
+        return f"{self.url}/.well-known/openid-configuration"
+
+    @property
+    def api_url(self) -> str:
+        """A protected resource, answers ``401`` unless called w/ a live access token."""
+        return f"{self.url}/api"
+
+    def start(self) -> "FakeIdP":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.idp = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeIdP":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def fail_next(self, count: int = 1, status: int = 503, endpoint: str = "token") -> None:
+        """Answer the next ``count`` requests to ``endpoint`` w/ ``status``."""
+        with self._lock:
+            self._failures.setdefault(endpoint, []).extend([status] * count)
+
+    def _injected_failure(self, endpoint: str) -> Optional[int]:
+        with self._lock:
+            pending = self._failures.get(endpoint)
+            return pending.pop(0) if pending else None
+
+    def revoke(self, access_token: str) -> None:
+        """Make ``/api`` reject ``access_token``, as if it had expired early."""
+        with self._lock:
+            self._access.pop(access_token, None)
+
+    def _issue(self, scope: List[str], refresh: bool = True, jkt: Optional[str] = None) -> dict:
+        access_token = secrets.token_urlsafe(16)
+        token: Dict[str, Any] = {
+            "access_token": access_token,
+            "token_type": "Bearer" if jkt is None else "DPoP",
+            "expires_in": self.expires_in,
+            "scope": " ".join(scope),
+        }
+        with self._lock:
+            self._access[access_token] = time.time() + self.expires_in
+            if refresh:
+                token["refresh_token"] = secrets.token_urlsafe(16)
+                token["refresh_expires_in"] = self.refresh_expires_in
+                self._refresh[token["refresh_token"]] = scope
+            if jkt is not None:
+                self._bound[access_token] = jkt
+                if refresh:
+                    self._bound[token["refresh_token"]] = jkt
+
+        return token
+
+    def _check_proof(
+        self, headers, method: str, url: str, access_token: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Reply]]:
+        """The thumbprint of the key a request's DPoP proof is from, or an error reply."""
+        proof = headers.get("DPoP")
+        if proof is None:
+            return None, None
+
+        header, claims = (json.loads(_unb64(segment)) for segment in proof.split(".")[:2])
+        ath = None
+        if access_token is not None:
+            ath = _b64(hashlib.sha256(access_token.encode()).digest())
+        if (
+            header.get("typ") != "dpop+jwt"
+            or claims.get("htm") != method
+            or claims.get("htu") != url
+            or claims.get("ath") != ath
+        ):
+            return None, (400, {"error": "invalid_dpop_proof"}, {})
+
+        if self.dpop_nonce is not None and claims.get("nonce") != self.dpop_nonce:
+            nonce = {"DPoP-Nonce": self.dpop_nonce}
+            if access_token is None:
+                return None, (400, {"error": "use_dpop_nonce"}, nonce)
+            challenge = {"WWW-Authenticate": 'DPoP error="use_dpop_nonce"'}
+            return None, (401, {"error": "use_dpop_nonce"}, {**nonce, **challenge})
+
+        with self._lock:
+            self.dpop_proofs.append(claims)
+        # RFC 7638 thumbprint, over the key's required members only
+        jwk = {k: v for k, v in header["jwk"].items() if k in ("crv", "e", "kty", "n", "x", "y")}
+        canonical = json.dumps(jwk, separators=(",", ":"), sort_keys=True).encode()
+        return _b64(hashlib.sha256(canonical).digest()), None
+
+    def _get__well_known_openid_configuration(self, query, headers) -> Reply:
+        cache_headers = {"Cache-Control": f"max-age={self.discovery_max_age}", "ETag": '"fake-idp"'}
+        if headers.get("If-None-Match") == cache_headers["ETag"]:
+            return 304, None, cache_headers
+
+        return (
+            200,
+            {
+                "issuer": self.url,
+                "authorization_endpoint": f"{self.url}/authorize",
+                "token_endpoint": f"{self.url}/token",
+                "device_authorization_endpoint": f"{self.url}/device",
+                "jwks_uri": f"{self.url}/jwks",
+                "dpop_signing_alg_values_supported": ["ES256", "EdDSA", "ES384", "RS256"],
+            },
+            cache_headers,
+        )
+
+    def _get_authorize(self, query, headers) -> Reply:
+        code = secrets.token_urlsafe(16)
+        with self._lock:
+            self._codes[code] = query.get("scope", ["openid"])[0].split()
+
+        params = {"code": code}
+        if "state" in query:
+            params["state"] = query["state"][0]
+        location = f"{query['redirect_uri'][0]}?{urlencode(params)}"
+        return 302, {}, {"Location": location}
+
+    def _get_api(self, query, headers) -> Reply:
+        scheme, _, token = headers.get("Authorization", "").partition(" ")
+        with self._lock:
+            expires_at = self._access.get(token)
+            bound = self._bound.get(token)
+
+        if expires_at is None or expires_at < time.time():
+            return 401, {"error": "invalid_token"}, {"WWW-Authenticate": 'Bearer error="invalid_token"'}
+        if bound is not None or scheme == "DPoP":
+            jkt, error = self._check_proof(headers, "GET", self.api_url, token)
+            if error is not None:
+                return error
+            if scheme != "DPoP" or jkt != bound:
+                challenge = {"WWW-Authenticate": 'DPoP error="invalid_token"'}
+                return 401, {"error": "invalid_token"}, challenge
+        return 200, {"ok": True}, {}
+
+    def _post_device(self, form, headers) -> Reply:
+        device_code = secrets.token_urlsafe(16)
+        with self._lock:
+            self._devices[device_code] = self.device_approve_after
+
+        return (
+            200,
+            {
+                "device_code": device_code,
+                "user_code": "FAKE-CODE",
+                "verification_uri": f"{self.url}/device",
+                "verification_uri_complete": f"{self.url}/device?user_code=FAKE-CODE",
+                "expires_in": 600,
+                "interval": self.device_interval,
+            },
+            {},
+        )
+
+    def _authenticate(self, form, headers) -> bool:
+        if "client_assertion" in form:
+            return True
+
+        scheme, _, credentials = headers.get("Authorization", "").partition(" ")
+        if scheme == "Basic":
+            client_id, _, secret = base64.b64decode(credentials).decode().partition(":")
+        else:
+            client_id, secret = form.get("client_id", ""), form.get("client_secret", "")
+
+        if self.clients is None:
+            return bool(client_id and secret)
+        return client_id in self.clients and self.clients[client_id] == secret
+
+    def _post_token(self, form, headers) -> Reply:
+        grant_type = form.get("grant_type")
+        scope = form.get("scope", "openid").split()
+        jkt, error = self._check_proof(headers, "POST", f"{self.url}/token")
+        if error is not None:
+            return error
+
+        with self._lock:
+            if "client_assertion" in form:
+                self.assertions.append(form["client_assertion"])
+
+            if grant_type == "refresh_token":
+                scope = self._refresh.get(form.get("refresh_token", ""))
+                if scope is None or self._bound.get(form["refresh_token"], jkt) != jkt:
+                    return 400, {"error": "invalid_grant"}, {}
+                if self.rotate_refresh_tokens:
+                    del self._refresh[form["refresh_token"]]
+
+            elif grant_type == "authorization_code":
+                scope = self._codes.pop(form.get("code", ""), None)
+                if scope is None:
+                    return 400, {"error": "invalid_grant"}, {}
+
+            elif grant_type == "urn:ietf:params:oauth:grant-type:device_code":
+                pending = self._devices.get(form.get("device_code", ""))
+                if pending is None:
+                    return 400, {"error": "invalid_grant"}, {}
+                if pending > 0:
+                    self._devices[form["device_code"]] = pending - 1
+                    return 400, {"error": "authorization_pending"}, {}
+                del self._devices[form["device_code"]]
+
+            elif grant_type == "urn:ietf:params:oauth:grant-type:token-exchange":
+                expires_at = self._access.get(form.get("subject_token", ""))
+                if expires_at is None or expires_at < time.time():
+                    return 400, {"error": "invalid_grant"}, {}
+
+            elif grant_type != "client_credentials":
+                return 400, {"error": "unsupported_grant_type"}, {}
+
+            elif not self._authenticate(form, headers):
+                return 401, {"error": "invalid_client"}, {"WWW-Authenticate": "Basic"}
+
+        if grant_type == "urn:ietf:params:oauth:grant-type:token-exchange":
+            token = self._issue(scope, refresh=False, jkt=jkt)
+            token["issued_token_type"] = "urn:ietf:params:oauth:token-type:access_token"
+            return 200, token, {"Cache-Control": "no-store"}
+
+        token = self._issue(scope, jkt=jkt)
+        if grant_type == "refresh_token" and not self.rotate_refresh_tokens:
+            token["refresh_token"] = form["refresh_token"]
+        return 200, token, {"Cache-Control": "no-store"}
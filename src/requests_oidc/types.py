@@ -1,4 +1,4 @@
-from typing import Protocol, Optional
+from typing import Callable, Optional, Protocol, runtime_checkable
 
 
 class Plugin(Protocol):
@@ -7,3 +7,26 @@ class Plugin(Protocol):
 
     def update(self, token: dict) -> None:
         ...
+
+
+@runtime_checkable
+class SharedPlugin(Plugin, Protocol):
+    """A ``Plugin`` whose storage is shared w/ other processes.
+
+    Sessions re-``load`` it before each request to pick up tokens refreshed elsewhere,
+    and route refreshes through ``refresh`` so only one process hits the IdP.
+    """
+
+    def refresh(self, current: dict, fetch: Callable[[], dict]) -> dict:
+        """Return a token newer than ``current``, calling ``fetch`` only if no one else has."""
+        ...
+
+
+class AsyncPlugin(Protocol):
+    """``Plugin`` w/ coroutine counterparts, used by :mod:`requests_oidc.aio` when present."""
+
+    async def aload(self) -> Optional[dict]:
+        ...
+
+    async def aupdate(self, token: dict) -> None:
+        ...
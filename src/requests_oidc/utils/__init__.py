@@ -1,3 +1,50 @@
-from .catcher import RedirectCatcher
-from .discovery import ServerDetails
-from .scope import make_scope
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# Imported on first use, so ie. plugins needing ``make_scope`` don't drag in
+# requests (discovery) or http.server (RedirectCatcher)
+_LAZY = {
+    "ClientAssertion": ".assertion",
+    "RedirectCatcher": ".catcher",
+    "ClockSkew": ".clock",
+    "DiscoveryCache": ".discovery",
+    "DPoP": ".dpop",
+    "OSCachedDiscoveryCache": ".discovery",
+    "ServerDetails": ".discovery",
+    "default_cache": ".discovery",
+    "default_http": ".http",
+    "make_http_session": ".http",
+    "set_default_http": ".http",
+    "share_pool": ".http",
+    "make_scope": ".scope",
+    "Backoff": ".resilience",
+    "CircuitBreaker": ".resilience",
+    "Resilience": ".resilience",
+    "SingleFlight": ".singleflight",
+}
+
+if TYPE_CHECKING:
+    from .assertion import ClientAssertion
+    from .catcher import RedirectCatcher
+    from .clock import ClockSkew
+    from .discovery import DiscoveryCache, OSCachedDiscoveryCache, ServerDetails, default_cache
+    from .dpop import DPoP
+    from .http import default_http, make_http_session, set_default_http, share_pool
+    from .resilience import Backoff, CircuitBreaker, Resilience
+    from .scope import make_scope
+    from .singleflight import SingleFlight
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,108 @@
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+#: ``client_assertion_type`` of JWT client assertions, RFC 7523.
+JWT_BEARER = "urn:ietf:params:oauth:client-assertion-type:jwt-bearer"
+
+
+class ClientAssertion:
+    """Signs the JWTs a client authenticates to the token endpoint w/, for the
+    ``private_key_jwt`` & ``client_secret_jwt`` methods.
+
+    The key is parsed once, up front. Signed assertions are kept per token
+    endpoint, and reused until ``margin`` seconds before they expire, so a busy
+    client signs one every ``lifetime - margin`` seconds instead of one per token
+    request.
+
+    .. code-block:: python
+
+       # private_key_jwt
+       assertion = ClientAssertion(client_id, pem, algorithm="ES256", kid="2024-01")
+       # client_secret_jwt
+       assertion = ClientAssertion(client_id, client_secret, algorithm="HS256")
+
+       session = make_client_credentials_session(
+           oidc_url, client_id, client_assertion=assertion
+       )
+
+    Needs the ``jwt`` extra: ``pip install requests-oidc[jwt]``.
+
+    :param key: A PEM private key, a private JWK (as a dict), or for ``HS*``
+      algorithms the client's secret.
+    :param algorithm: Signing algorithm, defaults to the JWK's ``alg``, or ``RS256``.
+    :param kid: Key ID to put in the header, defaults to the JWK's ``kid``.
+    :param lifetime: Seconds each assertion is valid for.
+    :param margin: Sign a new assertion when the current one expires within this
+      many seconds.
+    :param reuse: Whether to reuse assertions at all. Turn it off for IdPs that
+      reject a ``jti`` they've seen before.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        key: Union[str, bytes, Dict[str, Any]],
+        *,
+        algorithm: Optional[str] = None,
+        kid: Optional[str] = None,
+        lifetime: float = 300,
+        margin: float = 30,
+        reuse: bool = True,
+    ) -> None:
+        self.client_id = client_id
+        if isinstance(key, dict):
+            jwk = jwt.PyJWK(key, algorithm)
+            self.algorithm = jwk.algorithm_name
+            self.kid = kid or jwk.key_id
+            self._key = jwk.key
+        else:
+            self.algorithm = algorithm or "RS256"
+            self.kid = kid
+            self._key = get_default_algorithms()[self.algorithm].prepare_key(key)
+        self.lifetime = lifetime
+        self.margin = margin
+        self.reuse = reuse
+        self._signed: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def method(self) -> str:
+        """The ``token_endpoint_auth_method`` this amounts to."""
+        return "client_secret_jwt" if self.algorithm.startswith("HS") else "private_key_jwt"
+
+    def _sign(self, audience: str, now: float) -> str:
+        claims = {
+            "iss": self.client_id,
+            "sub": self.client_id,
+            "aud": audience,
+            "jti": secrets.token_urlsafe(16),
+            "iat": int(now),
+            "exp": int(now + self.lifetime),
+        }
+        headers = {"kid": self.kid} if self.kid else None
+        return jwt.encode(claims, self._key, algorithm=self.algorithm, headers=headers)
+
+    def sign(self, audience: str) -> str:
+        """An assertion for ``audience``, the token endpoint's URL."""
+        now = time.time()
+        if not self.reuse:
+            return self._sign(audience, now)
+
+        with self._lock:
+            cached = self._signed.get(audience)
+            if cached is None or now >= cached[1] - self.margin:
+                cached = self._signed[audience] = (self._sign(audience, now), now + self.lifetime)
+            return cached[0]
+
+    def params(self, audience: str) -> Dict[str, str]:
+        """Request body parameters authenticating the client to ``audience``."""
+        return {
+            "client_id": self.client_id,
+            "client_assertion_type": JWT_BEARER,
+            "client_assertion": self.sign(audience),
+        }
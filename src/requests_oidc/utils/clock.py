@@ -0,0 +1,63 @@
+import statistics
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque
+
+
+class ClockSkew:
+    """Estimates how far the IdP's clock is from ours, from the ``Date`` headers
+    on its responses.
+
+    Tokens' lifetimes (``expires_in``) are relative, but some of their timestamps
+    aren't: ie. a JWT access token's ``exp`` & ``iat`` are in the IdP's time. On a
+    host whose clock is off, those make tokens look expired early, or valid for
+    too long. Pass one to a session as ``clock_skew`` to have such timestamps
+    moved onto the local clock. Only its validator reads them, so that needs
+    ``validate=True`` too.
+
+    ``Date`` only has a resolution of a second, so the estimate is the median of
+    the last ``samples`` readings, and offsets within ``tolerance`` count as none.
+
+    :param samples: Readings to keep.
+    :param tolerance: Seconds of offset to put down to ``Date``'s resolution.
+    """
+
+    def __init__(self, samples: int = 8, tolerance: float = 2.0) -> None:
+        self.tolerance = tolerance
+        self._samples: Deque[float] = deque(maxlen=samples)
+        self._offset = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def offset(self) -> float:
+        """Seconds the IdP's clock is ahead of ours, negative when it's behind."""
+        return self._offset
+
+    def observe(self, response: Any) -> None:
+        """Take a reading from ``response``'s ``Date`` header, if it has one."""
+        date = response.headers.get("Date")
+        if date is None:
+            return
+        try:
+            server = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            return
+
+        # The server stamped the response about halfway through the round trip,
+        # and truncated it to the second
+        elapsed = getattr(response, "elapsed", None)
+        stamped = time.time() - (elapsed.total_seconds() / 2 if elapsed is not None else 0)
+        with self._lock:
+            self._samples.append(server + 0.5 - stamped)
+            offset = statistics.median(self._samples)
+            self._offset = 0.0 if abs(offset) <= self.tolerance else offset
+
+    def now(self) -> float:
+        """The IdP's current time, as a timestamp."""
+        return time.time() + self._offset
+
+    def local(self, timestamp: float) -> float:
+        """``timestamp`` in the IdP's time, moved onto the local clock."""
+        return timestamp - self._offset
@@ -1,27 +1,291 @@
-from dataclasses import dataclass
-from typing import Type, TypeVar
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Type, TypeVar
 
+import platformdirs
 import requests
 
+from ..instrumentation import span
+from .http import default_http
+
+if TYPE_CHECKING:
+    import httpx
+
 TSelf = TypeVar("TSelf", bound="ServerDetails")
 
 
+@dataclass
+class CacheEntry:
+    data: dict
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def _freshness(headers: Mapping[str, str], default_ttl: float) -> Optional[float]:
+    """Seconds a discovery document may be served from cache, per RFC 9111.
+
+    Returns ``None`` if the response must not be stored at all.
+    """
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+
+    try:
+        age = float(headers.get("Age", 0) or 0)
+    except ValueError:
+        # Malformed Age, go by the other headers as if there was none
+        age = 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(float(directives[name]) - age, 0.0)
+            except ValueError:
+                pass
+
+    if "Expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            # Malformed Expires means "already expired"
+            return 0.0
+        return max(expires - time.time(), 0.0)
+
+    return default_ttl
+
+
+class DiscoveryCache:
+    """Caches ``.well-known/openid-configuration`` documents, keyed by URL.
+
+    Entries live for as long as the server's ``Cache-Control`` / ``Expires`` headers
+    allow (or ``default_ttl`` seconds if it sends neither). Stale entries are
+    revalidated w/ ``If-None-Match`` / ``If-Modified-Since``, so a server that
+    supports it only has to answer ``304 Not Modified``.
+
+    :param path: Optional JSON file to persist entries to, so they survive restarts.
+    :param default_ttl: Lifetime of documents served w/o any caching headers.
+    """
+
+    def __init__(self, path: Optional[Path] = None, default_ttl: float = 3600) -> None:
+        self.path = path
+        self.default_ttl = default_ttl
+        self._entries: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self) -> None:
+        if self._loaded or self.path is None:
+            return
+        self._loaded = True
+
+        try:
+            with self.path.open() as f:
+                raw = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        for url, entry in raw.items():
+            self._entries.setdefault(url, CacheEntry(**entry))
+
+    def _store(self) -> None:
+        if self.path is None:
+            return
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w") as f:
+            json.dump({url: asdict(e) for url, e in self._entries.items()}, f)
+        tmp.replace(self.path)
+
+    def get(self, oidc_url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            self._load()
+            return self._entries.get(oidc_url)
+
+    def put(self, oidc_url: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._load()
+            self._entries[oidc_url] = entry
+            self._store()
+
+    def discard(self, oidc_url: str) -> None:
+        with self._lock:
+            self._load()
+            if self._entries.pop(oidc_url, None) is not None:
+                self._store()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._store()
+
+    def _revalidation_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _record(
+        self,
+        oidc_url: str,
+        entry: Optional[CacheEntry],
+        data: dict,
+        headers: Mapping[str, str],
+    ) -> None:
+        ttl = _freshness(headers, self.default_ttl)
+        if ttl is None:
+            self.discard(oidc_url)
+            return
+
+        self.put(
+            oidc_url,
+            CacheEntry(
+                data=data,
+                expires_at=time.time() + ttl,
+                etag=headers.get("ETag", entry.etag if entry else None),
+                last_modified=headers.get(
+                    "Last-Modified", entry.last_modified if entry else None
+                ),
+            ),
+        )
+
+    def fetch(self, oidc_url: str, http: Optional[requests.Session] = None) -> dict:
+        """Return the discovery document for ``oidc_url``, hitting the network only if needed."""
+        with span("discovery", url=oidc_url) as attrs:
+            entry = self.get(oidc_url)
+            if entry is not None and entry.fresh():
+                attrs["outcome"] = "hit"
+                return entry.data
+
+            http = http or default_http()
+            res = http.get(oidc_url, headers=self._revalidation_headers(entry))
+
+            if res.status_code == 304 and entry is not None:
+                attrs["outcome"] = "revalidated"
+                data = entry.data
+            else:
+                res.raise_for_status()
+                attrs["outcome"] = "fetched"
+                data = res.json()
+
+            self._record(oidc_url, entry, data, res.headers)
+            return data
+
+    async def afetch(self, oidc_url: str, client: "httpx.AsyncClient") -> dict:
+        """Same as :meth:`fetch`, but w/ an ``httpx.AsyncClient``."""
+        with span("discovery", url=oidc_url) as attrs:
+            entry = self.get(oidc_url)
+            if entry is not None and entry.fresh():
+                attrs["outcome"] = "hit"
+                return entry.data
+
+            res = await client.get(oidc_url, headers=self._revalidation_headers(entry))
+
+            if res.status_code == 304 and entry is not None:
+                attrs["outcome"] = "revalidated"
+                data = entry.data
+            else:
+                res.raise_for_status()
+                attrs["outcome"] = "fetched"
+                data = res.json()
+
+            self._record(oidc_url, entry, data, res.headers)
+            return data
+
+
+class OSCachedDiscoveryCache(DiscoveryCache):
+    """Same as ``DiscoveryCache``, but persists to the OS's user-cache directory,
+    alongside :class:`~requests_oidc.plugins.OSCachedPlugin`'s tokens."""
+
+    def __init__(
+        self,
+        appname: str,
+        appauthor: str,
+        version: Optional[str] = None,
+        filename: str = "discovery.json",
+        *,
+        default_ttl: float = 3600,
+    ) -> None:
+        dirs = platformdirs.PlatformDirs(appname=appname, appauthor=appauthor, version=version)
+        dir = dirs.user_cache_path
+        dir.mkdir(parents=True, exist_ok=True)
+        super().__init__(dir / filename, default_ttl=default_ttl)
+
+
+#: Process-wide cache used by :meth:`ServerDetails.discover` unless told otherwise.
+default_cache = DiscoveryCache()
+
+
 @dataclass
 class ServerDetails:
     oidc_url: str
     auth_url: str
     token_url: str
     device_url: str
+    issuer: Optional[str] = None
+    jwks_uri: Optional[str] = None
+    dpop_algs: Optional[List[str]] = None
+    id_token_algs: Optional[List[str]] = None
+
+    @classmethod
+    def discover(
+        cls: Type[TSelf],
+        oidc_url: str,
+        cache: Optional[DiscoveryCache] = default_cache,
+        http: Optional[requests.Session] = None,
+    ) -> TSelf:
+        if cache is None:
+            with span("discovery", url=oidc_url, outcome="uncached"):
+                res = (http or default_http()).get(oidc_url)
+                res.raise_for_status()
+                data = res.json()
+        else:
+            data = cache.fetch(oidc_url, http)
+
+        return cls.from_document(oidc_url, data)
 
     @classmethod
-    def discover(cls: Type[TSelf], oidc_url: str) -> TSelf:
-        res = requests.get(oidc_url)
-        res.raise_for_status()
-        data = res.json()
+    async def adiscover(
+        cls: Type[TSelf],
+        oidc_url: str,
+        client: "httpx.AsyncClient",
+        cache: Optional[DiscoveryCache] = default_cache,
+    ) -> TSelf:
+        if cache is None:
+            with span("discovery", url=oidc_url, outcome="uncached"):
+                res = await client.get(oidc_url)
+                res.raise_for_status()
+                data = res.json()
+        else:
+            data = await cache.afetch(oidc_url, client)
+
+        return cls.from_document(oidc_url, data)
 
+    @classmethod
+    def from_document(cls: Type[TSelf], oidc_url: str, data: dict) -> TSelf:
         return cls(
             oidc_url=oidc_url,
             auth_url=data["authorization_endpoint"],
             token_url=data["token_endpoint"],
             device_url=data["device_authorization_endpoint"],
+            issuer=data.get("issuer"),
+            jwks_uri=data.get("jwks_uri"),
+            dpop_algs=data.get("dpop_signing_alg_values_supported"),
+            id_token_algs=data.get("id_token_signing_alg_values_supported"),
         )
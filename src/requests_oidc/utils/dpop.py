@@ -0,0 +1,229 @@
+import base64
+import hashlib
+import json
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+
+from ..types import Plugin
+
+#: Algorithms proofs can be signed w/, fastest to sign first.
+ALGORITHMS = ("ES256", "EdDSA", "ES384", "RS256")
+
+_EC = {
+    "ES256": (ec.SECP256R1, hashes.SHA256, "P-256"),
+    "ES384": (ec.SECP384R1, hashes.SHA384, "P-384"),
+}
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _int(value: int) -> str:
+    return _b64(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _generate(algorithm: str) -> Any:
+    if algorithm in _EC:
+        return ec.generate_private_key(_EC[algorithm][0]())
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _public_jwk(algorithm: str, key: Any) -> Dict[str, str]:
+    # Members in lexicographic order, as the thumbprint needs them
+    if algorithm in _EC:
+        numbers = key.public_key().public_numbers()
+        size = (key.curve.key_size + 7) // 8
+        return {
+            "crv": _EC[algorithm][2],
+            "kty": "EC",
+            "x": _b64(numbers.x.to_bytes(size, "big")),
+            "y": _b64(numbers.y.to_bytes(size, "big")),
+        }
+    if algorithm == "EdDSA":
+        raw = key.public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {"crv": "Ed25519", "kty": "OKP", "x": _b64(raw)}
+
+    numbers = key.public_key().public_numbers()
+    return {"e": _int(numbers.e), "kty": "RSA", "n": _int(numbers.n)}
+
+
+class DPoP:
+    """Proves possession of a key pair to the IdP & APIs, so tokens are bound to
+    it (RFC 9449), and useless to anyone who steals them w/o the key.
+
+    Pass one to any session factory as ``dpop``. Token requests and requests
+    w/ the token then carry a ``DPoP`` proof, and the token is sent as
+    ``Authorization: DPoP ...``.
+
+    The proof's header (w/ the public key) is encoded once, so a proof costs one
+    signature plus a few small JSON dumps. Nonces servers hand back in
+    ``DPoP-Nonce`` are kept per origin and used in later proofs, and a request
+    rejected w/ ``use_dpop_nonce`` is retried once w/ the new nonce.
+
+    .. code-block:: python
+
+       dpop = DPoP(PathPlugin(Path("~/.cache/app/dpop.json").expanduser()))
+       session = make_device_code_session(oidc_url, client_id, audience, dpop=dpop)
+
+    Needs the ``jwt`` extra: ``pip install requests-oidc[jwt]``.
+
+    :param plugin: Plugin to store the key pair w/, so tokens (ie. refresh
+      tokens, for public clients) stay usable across restarts. Without one, a key
+      is generated per process.
+    :param algorithm: Algorithm to sign proofs w/, defaults to the fastest the IdP
+      supports, see :data:`ALGORITHMS`.
+    """
+
+    def __init__(
+        self, plugin: Optional[Plugin] = None, *, algorithm: Optional[str] = None
+    ) -> None:
+        if algorithm is not None and algorithm not in ALGORITHMS:
+            raise ValueError(f"DPoP w/ {algorithm} isn't supported, use one of {ALGORITHMS}")
+
+        self.plugin = plugin
+        self.algorithm = algorithm
+        #: The public key, as a JWK.
+        self.jwk: Optional[Dict[str, str]] = None
+        #: The public key's JWK thumbprint, ie. for ``dpop_jkt``.
+        self.thumbprint: Optional[str] = None
+        self._key: Any = None
+        self._header = b""
+        self._nonces: Dict[str, str] = {}
+        self._ath: Tuple[Optional[str], str] = (None, "")
+        self._lock = threading.Lock()
+
+    def bind(self, supported: Optional[Sequence[str]] = None) -> None:
+        """Load or generate the key pair, for an IdP supporting ``supported``
+        algorithms (its ``dpop_signing_alg_values_supported``).
+
+        Session factories call this, it's a no-op once there's a suitable key.
+        """
+        with self._lock:
+            if self._key is not None and (not supported or self.algorithm in supported):
+                return
+
+            stored = self.plugin.load() if self.plugin is not None else None
+            if stored is not None and (not supported or stored["alg"] in supported):
+                algorithm = stored["alg"]
+                key = serialization.load_pem_private_key(stored["key"].encode(), None)
+            else:
+                algorithm = self._choose(supported)
+                key = _generate(algorithm)
+                if self.plugin is not None:
+                    pem = key.private_bytes(
+                        serialization.Encoding.PEM,
+                        serialization.PrivateFormat.PKCS8,
+                        serialization.NoEncryption(),
+                    )
+                    self.plugin.update({"alg": algorithm, "key": pem.decode()})
+
+            self._use(algorithm, key)
+
+    def _choose(self, supported: Optional[Sequence[str]]) -> str:
+        if self.algorithm is not None:
+            if supported and self.algorithm not in supported:
+                raise ValueError(f"The IdP doesn't support DPoP w/ {self.algorithm}")
+            return self.algorithm
+
+        for algorithm in ALGORITHMS:
+            if not supported or algorithm in supported:
+                return algorithm
+        raise ValueError(f"The IdP only supports DPoP w/ {', '.join(supported or [])}")
+
+    def _use(self, algorithm: str, key: Any) -> None:
+        jwk = _public_jwk(algorithm, key)
+        canonical = json.dumps(jwk, separators=(",", ":"), sort_keys=True).encode()
+        header = {"typ": "dpop+jwt", "alg": algorithm, "jwk": jwk}
+
+        self.algorithm = algorithm
+        self.jwk = jwk
+        self.thumbprint = _b64(hashlib.sha256(canonical).digest())
+        self._header = _b64(json.dumps(header, separators=(",", ":")).encode()).encode()
+        self._key = key
+        if algorithm in _EC:
+            self._ecdsa = ec.ECDSA(_EC[algorithm][1]())
+            self._size = (key.curve.key_size + 7) // 8
+
+    def _sign(self, data: bytes) -> bytes:
+        if self.algorithm in _EC:
+            r, s = decode_dss_signature(self._key.sign(data, self._ecdsa))
+            return r.to_bytes(self._size, "big") + s.to_bytes(self._size, "big")
+        if self.algorithm == "EdDSA":
+            return self._key.sign(data)
+        return self._key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+
+    def _access_token_hash(self, access_token: str) -> str:
+        # Every request w/ the same token hashes it the same, only do it once per token
+        cached, ath = self._ath
+        if cached != access_token:
+            ath = _b64(hashlib.sha256(access_token.encode()).digest())
+            self._ath = (access_token, ath)
+        return ath
+
+    def proof(self, method: str, url: str, access_token: Optional[str] = None) -> str:
+        """A proof for one request, bound to ``access_token`` if it carries one."""
+        if self._key is None:
+            self.bind()
+
+        parts = urlsplit(url)
+        claims = {
+            "jti": secrets.token_urlsafe(12),
+            "htm": method,
+            "htu": f"{parts.scheme}://{parts.netloc}{parts.path}",
+            "iat": int(time.time()),
+        }
+        nonce = self._nonces.get(f"{parts.scheme}://{parts.netloc}")
+        if nonce is not None:
+            claims["nonce"] = nonce
+        if access_token is not None:
+            claims["ath"] = self._access_token_hash(access_token)
+
+        signing_input = self._header + b"." + _b64(json.dumps(claims, separators=(",", ":")).encode()).encode()
+        return (signing_input + b"." + _b64(self._sign(signing_input)).encode()).decode()
+
+    def observe(self, response: Any) -> bool:
+        """Keep the nonce ``response`` came w/, returns whether the request needs
+        to be retried w/ it (ie. the server said ``use_dpop_nonce``).
+
+        Works w/ ``requests`` & ``httpx`` responses.
+        """
+        nonce = response.headers.get("DPoP-Nonce")
+        if nonce is None:
+            return False
+
+        self._nonces[_origin(str(response.url))] = nonce
+        if response.status_code == 401:
+            return "use_dpop_nonce" in response.headers.get("WWW-Authenticate", "")
+        if response.status_code == 400:
+            try:
+                return response.json().get("error") == "use_dpop_nonce"
+            except ValueError:
+                return False
+        return False
+
+    def headers(self, method: str, url: str, access_token: Optional[str] = None) -> Dict[str, str]:
+        """Headers authenticating a request w/ ``access_token``, or just proving
+        possession of the key when there's no token (ie. to the token endpoint).
+        """
+        headers = {"DPoP": self.proof(method, url, access_token)}
+        if access_token is not None:
+            headers["Authorization"] = f"DPoP {access_token}"
+        return headers
+
@@ -0,0 +1,61 @@
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_default: Optional[requests.Session] = None
+_default_lock = threading.Lock()
+
+
+def make_http_session(
+    pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0
+) -> requests.Session:
+    """A ``requests.Session`` w/ keep-alive pools sized for talking to IdPs.
+
+    :param pool_connections: Number of hosts to keep pools for.
+    :param pool_maxsize: Max connections kept open per host, raise this if many
+      threads hit the same IdP at once.
+    :param max_retries: Passed to ``HTTPAdapter``.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def default_http() -> requests.Session:
+    """Process-wide session used for IdP traffic when a factory isn't handed one."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = make_http_session()
+    return _default
+
+
+def set_default_http(session: requests.Session) -> None:
+    """Replace the process-wide session, ie. w/ bigger pools."""
+    global _default
+    _default = session
+
+
+def share_pool(
+    session: requests.Session, http: requests.Session, url: Optional[str] = None
+) -> None:
+    """Mount ``http``'s adapters on ``session``, so both reuse the same connections.
+
+    :param url: Only share them for requests to this URL's origin, ie. the IdP's,
+      so ``session`` keeps its own pools for everything else.
+    """
+    if url is None:
+        for prefix, adapter in http.adapters.items():
+            session.mount(prefix, adapter)
+        return
+
+    parts = urlsplit(url)
+    session.mount(f"{parts.scheme}://{parts.netloc}/", http.get_adapter(url))
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+import jwt
+import requests
+
+from ..exceptions import AuthFlowError
+from .http import default_http
+
+if TYPE_CHECKING:
+    from .clock import ClockSkew
+
+
+class JWKSCache:
+    """The IdP's signing keys, fetched once and refetched when they rotate.
+
+    A ``kid`` we haven't seen before triggers a refetch, since that's what key
+    rotation looks like from the outside. Refetches are rate-limited, so garbage
+    tokens can't be used to hammer the IdP.
+
+    :param jwks_uri: The ``jwks_uri`` from the server's discovery document.
+    :param http: Session to fetch keys w/.
+    :param min_refetch_interval: Minimum seconds between fetches.
+    """
+
+    _registry: Dict[str, "JWKSCache"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        jwks_uri: str,
+        http: Optional[requests.Session] = None,
+        min_refetch_interval: float = 60,
+    ) -> None:
+        self.jwks_uri = jwks_uri
+        self.http = http
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_uri(cls, jwks_uri: str, http: Optional[requests.Session] = None) -> "JWKSCache":
+        """Process-wide cache for ``jwks_uri``, so sessions w/ the same IdP share keys."""
+        with cls._registry_lock:
+            if jwks_uri not in cls._registry:
+                cls._registry[jwks_uri] = cls(jwks_uri, http)
+            return cls._registry[jwks_uri]
+
+    def _fetch(self) -> None:
+        res = (self.http or default_http()).get(self.jwks_uri)
+        res.raise_for_status()
+        keys = jwt.PyJWKSet.from_dict(res.json())
+        self._keys = {key.key_id: key for key in keys.keys if key.key_id}
+        self._fetched_at = time.monotonic()
+
+    def get(self, kid: str) -> jwt.PyJWK:
+        with self._lock:
+            if kid not in self._keys and (
+                self._fetched_at is None
+                or time.monotonic() - self._fetched_at >= self.min_refetch_interval
+            ):
+                self._fetch()
+
+            try:
+                return self._keys[kid]
+            except KeyError:
+                raise AuthFlowError(f"No signing key w/ kid {kid!r} at {self.jwks_uri}")
+
+
+class TokenValidator:
+    """Checks tokens against the IdP's signing keys, w/o calling the IdP.
+
+    ``id_token`` signatures, issuer & audience are verified. If the access token is
+    a JWT, its signature is verified too, and its ``exp`` / ``scope`` claims replace
+    the ``expires_at`` / ``scope`` fields the token endpoint reported, so expiry and
+    scope checks go by what the resource server will actually see.
+
+    Signatures are only accepted w/ the algorithm of the key they name, never
+    the one the token's header claims.
+
+    Decoded claims are memoized per token string.
+
+    :param jwks: Keys to verify signatures w/.
+    :param issuer: Expected ``iss`` of ``id_token`` s.
+    :param client_id: Expected ``aud`` of ``id_token`` s.
+    :param maxsize: How many tokens to memoize claims for.
+    :param clock_skew: The IdP's clock offset. ``exp`` is moved onto the local
+      clock w/ it, and ``iat`` / ``nbf`` are checked w/ that much leeway.
+    :param id_token_algs: Algorithms ``id_token`` s may be signed w/, ie. the IdP's
+      ``id_token_signing_alg_values_supported``.
+    """
+
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        issuer: Optional[str] = None,
+        client_id: Optional[str] = None,
+        maxsize: int = 256,
+        clock_skew: Optional["ClockSkew"] = None,
+        id_token_algs: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.jwks = jwks
+        self.issuer = issuer
+        self.client_id = client_id
+        self.maxsize = maxsize
+        self.clock_skew = clock_skew
+        self.id_token_algs = id_token_algs
+        self._claims: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claims(self, token: str, algs: Optional[Sequence[str]] = None, **options) -> dict:
+        """Verify ``token`` and return its claims.
+
+        :param algs: Algorithms to accept, on top of having to match the key's.
+        :param options: Passed to ``jwt.decode``, ie. ``audience``.
+        """
+        with self._lock:
+            if token in self._claims:
+                self._claims.move_to_end(token)
+                return self._claims[token]
+
+        try:
+            header = jwt.get_unverified_header(token)
+            key = self.jwks.get(header["kid"])
+            if algs is not None and key.algorithm_name not in algs:
+                raise jwt.InvalidAlgorithmError(
+                    f"signed w/ {key.algorithm_name}, expected one of {', '.join(algs)}"
+                )
+            claims = jwt.decode(
+                token,
+                key=key,
+                algorithms=[key.algorithm_name],
+                # Expiry is decided by the caller, expired tokens can still be refreshed
+                options={"verify_exp": False, "verify_aud": "audience" in options},
+                leeway=abs(self.clock_skew.offset) if self.clock_skew is not None else 0,
+                **options,
+            )
+        except (jwt.InvalidTokenError, KeyError) as e:
+            raise AuthFlowError(f"Token failed validation: {e}")
+
+        with self._lock:
+            self._claims[token] = claims
+            while len(self._claims) > self.maxsize:
+                self._claims.popitem(last=False)
+
+        return claims
+
+    def apply(self, token: dict) -> dict:
+        """Validate ``token`` in place, updating its expiry & scope from its claims."""
+        if "id_token" in token:
+            options = {}
+            if self.client_id is not None:
+                options["audience"] = self.client_id
+            if self.issuer is not None:
+                options["issuer"] = self.issuer
+            self.claims(token["id_token"], self.id_token_algs, **options)
+
+        access_token = token.get("access_token", "")
+        if access_token.count(".") == 2:
+            claims = self.claims(access_token)
+            if "exp" in claims:
+                exp = claims["exp"]
+                token["expires_at"] = exp if self.clock_skew is None else self.clock_skew.local(exp)
+            if "scope" in claims:
+                token["scope"] = claims["scope"].split()
+
+        return token
@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from oauthlib.oauth2 import OAuth2Error
+
+from ..exceptions import CircuitOpenError
+
+T = TypeVar("T")
+
+
+def transient(error: BaseException) -> bool:
+    """Whether ``error`` means the IdP is struggling, rather than saying no."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, CircuitOpenError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return unavailable(error.response.status_code)
+    if isinstance(error, OAuth2Error):
+        return error.error in ("temporarily_unavailable", "server_error") or unavailable(
+            error.status_code
+        )
+    return False
+
+
+def unavailable(status_code: int) -> bool:
+    """Whether a response w/ ``status_code`` is worth retrying later."""
+    return status_code >= 500 or status_code == 429
+
+
+class Backoff:
+    """Exponential backoff w/ full jitter, so retrying clients spread out.
+
+    :param base: Upper bound of the first delay, in seconds. Doubles per attempt.
+    :param cap: Largest upper bound a delay can have.
+    :param attempts: Tries in total, including the first.
+    """
+
+    def __init__(self, base: float = 0.2, cap: float = 5.0, attempts: int = 3) -> None:
+        self.base = base
+        self.cap = cap
+        self.attempts = attempts
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number ``retry``, counting from 0."""
+        return random.uniform(0, min(self.cap, self.base * 2**retry))
+
+
+class CircuitBreaker:
+    """Stops calling an IdP that keeps failing, for a while.
+
+    After ``threshold`` consecutive transient failures, the breaker opens and calls
+    fail immediately w/ :class:`~requests_oidc.exceptions.CircuitOpenError`. After
+    ``reset_after`` seconds one trial call is let through, closing the breaker if
+    it succeeds and re-opening it if not.
+
+    :param threshold: Consecutive failures that open the breaker.
+    :param reset_after: Seconds to stay open before a trial call.
+    """
+
+    _registry: Dict[str, "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_url(cls, url: str) -> "CircuitBreaker":
+        """Process-wide breaker for ``url``'s host, so sessions w/ the same IdP share one."""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls()
+            return cls._registry[key]
+
+    @property
+    def open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures = 0
+                self._opened_at = None
+                return
+
+            self.failures += 1
+            if self.failures >= self.threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class Resilience:
+    """How a session copes w/ a failing token endpoint.
+
+    Transient failures (connection errors, timeouts, ``5xx``, ``429``) are retried
+    w/ ``backoff``, and counted by a circuit breaker per IdP. Anything else, like
+    ``invalid_grant``, is raised right away.
+
+    :param backoff: Retry schedule, ``Backoff(attempts=1)`` to not retry.
+    :param breaker: Breaker to use, defaults to the IdP's shared one, see
+      :meth:`CircuitBreaker.for_url`.
+    :param serve_stale: Seconds before expiry to start refreshing in the
+      background. Requests keep using the current token meanwhile, even if the
+      refresh fails, until it actually expires.
+    """
+
+    def __init__(
+        self,
+        *,
+        backoff: Optional[Backoff] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        serve_stale: float = 0,
+    ) -> None:
+        self.backoff = backoff or Backoff()
+        self.breaker = breaker
+        self.serve_stale = serve_stale
+
+    def call(self, url: str, fn: Callable[[], T]) -> T:
+        """Call ``fn``, which talks to ``url``, retrying transient failures."""
+        breaker = self.breaker or CircuitBreaker.for_url(url)
+        retry = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Not calling {url}, it's been failing")
+
+            try:
+                result = fn()
+            except Exception as e:
+                if not transient(e):
+                    # The IdP answered, it's just saying no
+                    breaker.record(True)
+                    raise
+                breaker.record(False)
+                if retry + 1 >= self.backoff.attempts:
+                    raise
+                time.sleep(self.backoff.delay(retry))
+                retry += 1
+                continue
+
+            breaker.record(True)
+            return result
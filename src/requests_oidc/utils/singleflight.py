@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from ..exceptions import RefreshTimeoutError
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "finished")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished = 0.0
+
+
+class SingleFlight:
+    """Collapses concurrent calls into one, every caller gets the leader's result.
+
+    :param timeout: Seconds a follower will wait on the leader before giving up
+      w/ :class:`~requests_oidc.exceptions.RefreshTimeoutError`. ``None`` waits forever.
+    :param window: Seconds after a successful call during which new callers reuse
+      its result, rather than starting another call. Off by default: a caller
+      that runs after the leader finished usually wants a fresh result, ie. a
+      refresh because the last token was rejected.
+    """
+
+    def __init__(self, timeout: Optional[float] = 30.0, window: float = 0) -> None:
+        self.timeout = timeout
+        self.window = window
+        #: Number of calls that actually ran.
+        self.calls = 0
+        #: Number of calls that were served by another caller's result.
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flight: Optional[_Flight] = None
+
+    def _joinable(self, flight: Optional[_Flight]) -> bool:
+        if flight is None:
+            return False
+        if not flight.done.is_set():
+            return True
+        return flight.error is None and time.monotonic() - flight.finished < self.window
+
+    def expire(self) -> None:
+        """Don't let new callers reuse the last call's result, ie. once it's known
+        to be bad. A call still in flight is unaffected.
+        """
+        with self._lock:
+            if self._flight is not None and self._flight.done.is_set():
+                self._flight = None
+
+    def run(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            flight = self._flight
+            leader = not self._joinable(flight)
+            if leader:
+                flight = self._flight = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        assert flight is not None
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                raise RefreshTimeoutError(f"Gave up waiting {self.timeout}s on token refresh")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.finished = time.monotonic()
+            flight.done.set()
+
+        return flight.result
@@ -0,0 +1,18 @@
+import pytest
+
+from requests_oidc.testing import FakeIdP
+
+
+@pytest.fixture
+def idp():
+    with FakeIdP() as idp:
+        yield idp
+
+
+@pytest.fixture
+def unused_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
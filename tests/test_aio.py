@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from requests_oidc.aio import make_async_token_session
+
+OIDC_URL = "https://idp.example/.well-known/openid-configuration"
+TOKEN_URL = "https://idp.example/token"
+
+
+class MemoryPlugin:
+    def __init__(self, token):
+        self.token = token
+        self.updates = 0
+
+    def load(self):
+        return self.token
+
+    def update(self, token):
+        self.token = token
+        self.updates += 1
+
+
+def test_concurrent_requests_share_one_refresh():
+    refreshes = []
+
+    async def handler(request):
+        if request.url == OIDC_URL:
+            return httpx.Response(
+                200,
+                json={
+                    "authorization_endpoint": "https://idp.example/auth",
+                    "token_endpoint": TOKEN_URL,
+                    "device_authorization_endpoint": "https://idp.example/device",
+                },
+            )
+        if request.url == TOKEN_URL:
+            await asyncio.sleep(0.05)
+            refreshes.append(request.content)
+            return httpx.Response(
+                200,
+                json={"access_token": "fresh", "token_type": "Bearer", "expires_in": 300},
+            )
+        return httpx.Response(200, json={"auth": request.headers["Authorization"]})
+
+    plugin = MemoryPlugin(
+        {
+            "access_token": "stale",
+            "refresh_token": "r",
+            "token_type": "Bearer",
+            "scope": ["openid"],
+            "expires_at": time.time() - 1,
+            "expires_in": 300,
+            "refresh_expires_in": 3600,
+        }
+    )
+
+    async def main():
+        client = await make_async_token_session(
+            OIDC_URL,
+            "client",
+            plugin=plugin,
+            discovery_cache=None,
+            transport=httpx.MockTransport(handler),
+        )
+        try:
+            responses = await asyncio.gather(
+                *(client.get("https://api.example/") for _ in range(20))
+            )
+        finally:
+            await client.aclose()
+        return client, responses
+
+    client, responses = asyncio.run(main())
+
+    assert len(refreshes) == 1
+    assert client.auth.coalesced == 19
+    assert plugin.updates == 1
+    assert all(json.loads(r.content) == {"auth": "Bearer fresh"} for r in responses)
+
+
+def test_client_credentials_fetch_lazily(idp):
+    from requests_oidc.aio import make_async_client_credentials_session
+
+    async def main():
+        client = await make_async_client_credentials_session(
+            idp.oidc_url, "client", "secret", discovery_cache=None
+        )
+        try:
+            assert idp.hits["token"] == 0
+            await client.get(idp.api_url)
+            return await client.get(idp.api_url)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main()).status_code == 200
+    assert idp.hits["token"] == 1
+
+
+def test_dpop_is_rejected(idp):
+    from requests_oidc.aio import make_async_client_credentials_session
+
+    with pytest.raises(ValueError, match="DPoP"):
+        asyncio.run(
+            make_async_client_credentials_session(
+                idp.oidc_url, "client", "secret", discovery_cache=None, dpop=object()
+            )
+        )
+    assert idp.hits[".well-known/openid-configuration"] == 0
+
+
+def test_client_credentials_send_the_client_credentials():
+    from urllib.parse import parse_qs
+
+    from requests_oidc.aio import make_async_client_credentials_session
+
+    fetches = []
+
+    def handler(request):
+        if request.url == OIDC_URL:
+            return httpx.Response(
+                200,
+                json={
+                    "authorization_endpoint": "https://idp.example/auth",
+                    "token_endpoint": TOKEN_URL,
+                    "device_authorization_endpoint": "https://idp.example/device",
+                },
+            )
+        if request.url == TOKEN_URL:
+            fetches.append(parse_qs(request.content.decode()))
+            return httpx.Response(
+                200,
+                json={"access_token": "fresh", "token_type": "Bearer", "expires_in": 300},
+            )
+        return httpx.Response(200)
+
+    async def main():
+        client = await make_async_client_credentials_session(
+            OIDC_URL,
+            "client",
+            "secret",
+            discovery_cache=None,
+            transport=httpx.MockTransport(handler),
+        )
+        try:
+            await client.get("https://api.example/")
+        finally:
+            await client.aclose()
+
+    asyncio.run(main())
+
+    (body,) = fetches
+    assert body["grant_type"] == ["client_credentials"]
+    assert body["client_id"] == ["client"] and body["client_secret"] == ["secret"]
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from requests_oidc import make_client_credentials_session, make_token_session
+from requests_oidc.plugins import PathPlugin
+from requests_oidc.session import ClientCredentialsSession
+from requests_oidc.utils import ClientAssertion
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def _pem(private_key):
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def test_private_key_jwt(idp, private_key):
+    assertion = ClientAssertion("client", _pem(private_key), algorithm="ES256", kid="k1")
+    session = make_client_credentials_session(idp.oidc_url, "client", client_assertion=assertion)
+
+    session.get(idp.api_url).raise_for_status()
+    session.refresh_token(session.auto_refresh_url)
+
+    # Signed once, reused for the second token request
+    assert len(idp.assertions) == 2 and idp.assertions[0] == idp.assertions[1]
+    claims = jwt.decode(
+        idp.assertions[0], private_key.public_key(), ["ES256"], audience=f"{idp.url}/token"
+    )
+    assert claims["iss"] == claims["sub"] == "client"
+    assert jwt.get_unverified_header(idp.assertions[0])["kid"] == "k1"
+    assert assertion.method == "private_key_jwt"
+
+
+def test_client_secret_jwt_from_jwk():
+    jwk = {"kty": "oct", "k": "c2VjcmV0LXNlY3JldC1zZWNyZXQtc2VjcmV0LXNlY3JldA", "alg": "HS256"}
+    assertion = ClientAssertion("client", jwk)
+
+    signed = assertion.params("https://idp.example/token")["client_assertion"]
+
+    assert assertion.method == "client_secret_jwt"
+    assert jwt.decode(signed, jwt.PyJWK(jwk).key, ["HS256"], audience="https://idp.example/token")
+
+
+def test_assertions_are_resigned_when_expiring(private_key):
+    assertion = ClientAssertion("client", _pem(private_key), algorithm="ES256", lifetime=60)
+    audience = "https://idp.example/token"
+
+    assert assertion.sign(audience) == assertion.sign(audience)
+    assertion.margin = 60
+    assert assertion.sign(audience) != assertion.sign(audience)
+    assert ClientAssertion("c", _pem(private_key), algorithm="ES256", reuse=False).sign(
+        audience
+    ) != assertion.sign(audience)
+
+
+def test_refresh_sends_assertion(idp, private_key, tmp_path):
+    assertion = ClientAssertion("client", _pem(private_key), algorithm="ES256")
+    plugin = PathPlugin(tmp_path / "token.json")
+    token = idp._issue(["openid"])
+    token["expires_at"] = time.time() + token["expires_in"]
+    plugin.update(token)
+
+    session = make_token_session(idp.oidc_url, "client", plugin=plugin, client_assertion=assertion)
+    session.refresh_token(session.auto_refresh_url)
+
+    assert len(idp.assertions) == 1
+
+
+def test_needs_one_credential(idp, private_key):
+    assertion = ClientAssertion("client", _pem(private_key), algorithm="ES256")
+    with pytest.raises(ValueError):
+        make_client_credentials_session(idp.oidc_url, "client")
+    with pytest.raises(ValueError):
+        make_client_credentials_session(
+            idp.oidc_url, "client", "secret", client_assertion=assertion
+        )
+    assert isinstance(
+        make_client_credentials_session(idp.oidc_url, "client", client_assertion=assertion),
+        ClientCredentialsSession,
+    )
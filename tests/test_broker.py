@@ -0,0 +1,63 @@
+import sys
+import time
+
+import pytest
+
+from requests_oidc.broker import BrokerPlugin, TokenBroker, broker_key
+from requests_oidc.exceptions import AuthFlowError
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets only")
+
+
+class StubSession:
+    auto_refresh_url = "https://idp.example/token"
+    token_updater = None
+
+    def __init__(self):
+        self.refreshes = 0
+        self.token = self._make()
+
+    def _make(self):
+        return {"access_token": f"access-{self.refreshes}", "expires_at": time.time() + 300}
+
+    @property
+    def access_token(self):
+        return self.token["access_token"]
+
+    def refresh_token(self, url):
+        self.refreshes += 1
+        self.token = self._make()
+        return self.token
+
+
+def test_plugin_fetches_and_refreshes_through_broker(tmp_path):
+    key = broker_key("client", "api", ["read"])
+    session = StubSession()
+    broker = TokenBroker(tmp_path / "broker.sock")
+    broker.register(key, session)
+    broker.start()
+
+    try:
+        plugin = BrokerPlugin(tmp_path / "broker.sock", key)
+        token = plugin.load()
+        assert token["access_token"] == "access-0"
+        assert plugin.load() is token
+
+        refreshed = plugin.refresh(token, fetch=None)
+        assert refreshed["access_token"] == "access-1"
+        # Someone else already refreshed past the token we gave up on
+        assert plugin.refresh(token, fetch=None)["access_token"] == "access-1"
+        assert session.refreshes == 1
+    finally:
+        broker.shutdown()
+
+
+def test_unknown_credential_is_an_error(tmp_path):
+    broker = TokenBroker(tmp_path / "broker.sock")
+    broker.start()
+
+    try:
+        with pytest.raises(AuthFlowError, match="Unknown credential"):
+            BrokerPlugin(tmp_path / "broker.sock", "nope").refresh({}, fetch=None)
+    finally:
+        broker.shutdown()
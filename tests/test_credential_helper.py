@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from requests_oidc.credential_helper import main
+from requests_oidc.plugins import PathPlugin
+
+
+def test_valid_token_is_read_w_o_heavy_imports(tmp_path):
+    path = tmp_path / "token.json"
+    PathPlugin(path).update({"access_token": "abc", "expires_at": time.time() + 300})
+    script = (
+        "import sys, json; from requests_oidc.credential_helper import main; "
+        f"main([{str(path)!r}, '--header']); print(json.dumps(list(sys.modules)))"
+    )
+
+    header, modules = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout.splitlines()
+
+    assert header == "Authorization: Bearer abc"
+    assert not set(json.loads(modules)) & {"requests", "oauthlib", "typer", "platformdirs"}
+
+
+def test_expiring_token_is_refreshed(idp, tmp_path, capsys):
+    path = tmp_path / "token.json"
+    token = idp._issue(["openid"])
+    token["expires_at"] = time.time() + 5
+    PathPlugin(path).update(token)
+
+    main([str(path), "--oidc-url", idp.oidc_url, "--client-id", "client"])
+
+    printed = capsys.readouterr().out.strip()
+    assert printed != token["access_token"]
+    assert PathPlugin(path).load()["access_token"] == printed
+    assert idp.hits["token"] == 1
+
+
+def test_client_credentials_are_fetched(idp, tmp_path, capsys):
+    args = [str(tmp_path / "token.json"), "--oidc-url", idp.oidc_url, "--client-id", "client"]
+
+    main(args + ["--client-secret", "secret"])
+    main(args)
+
+    first, second = capsys.readouterr().out.split()
+    assert first == second
+    assert idp.hits["token"] == 1
+
+
+def test_no_token(tmp_path):
+    with pytest.raises(SystemExit, match="No valid token"):
+        main([str(tmp_path / "token.json")])
+
+
+def test_refresh_token_about_to_expire(idp, tmp_path):
+    path = tmp_path / "token.json"
+    token = idp._issue(["openid"])
+    token.update(expires_at=time.time() + 5, refresh_expires_in=token["expires_in"] + 5)
+    PathPlugin(path).update(token)
+
+    with pytest.raises(SystemExit, match="can't be refreshed"):
+        main([str(path), "--oidc-url", idp.oidc_url, "--client-id", "client"])
+
+
+def test_dpop_header(tmp_path, capsys):
+    path = tmp_path / "token.json"
+    PathPlugin(path).update(
+        {"access_token": "abc", "token_type": "DPoP", "expires_at": time.time() + 300}
+    )
+
+    main([str(path), "--header"])
+
+    assert capsys.readouterr().out == "Authorization: DPoP abc\n"
@@ -0,0 +1,70 @@
+import requests
+
+from requests_oidc.utils.discovery import DiscoveryCache, ServerDetails
+
+URL = "https://idp.example/.well-known/openid-configuration"
+DOC = {
+    "authorization_endpoint": "https://idp.example/auth",
+    "token_endpoint": "https://idp.example/token",
+    "device_authorization_endpoint": "https://idp.example/device",
+}
+
+
+class FakeHTTP:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, headers=None):
+        self.calls.append(headers)
+        return self.responses.pop(0)
+
+
+def _response(status, headers=None, body=DOC):
+    res = requests.Response()
+    res.status_code = status
+    res.headers.update(headers or {})
+    res._content = b"" if status == 304 else requests.compat.json.dumps(body).encode()
+    return res
+
+
+def test_fresh_entry_is_served_from_memory():
+    http = FakeHTTP(_response(200, {"Cache-Control": "max-age=60"}))
+    cache = DiscoveryCache()
+
+    ServerDetails.discover(URL, cache=cache, http=http)
+    details = ServerDetails.discover(URL, cache=cache, http=http)
+
+    assert details.token_url == DOC["token_endpoint"]
+    assert len(http.calls) == 1
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    http = FakeHTTP(
+        _response(200, {"Cache-Control": "no-cache", "ETag": '"v1"'}),
+        _response(304, {"Cache-Control": "max-age=60"}),
+    )
+    path = tmp_path / "discovery.json"
+
+    ServerDetails.discover(URL, cache=DiscoveryCache(path), http=http)
+    # New cache instance, so the entry has to come back off of disk
+    details = ServerDetails.discover(URL, cache=DiscoveryCache(path), http=http)
+
+    assert http.calls[1] == {"If-None-Match": '"v1"'}
+    assert details.device_url == DOC["device_authorization_endpoint"]
+
+
+def test_no_store_is_not_cached():
+    http = FakeHTTP(_response(200, {"Cache-Control": "no-store"}))
+    cache = DiscoveryCache()
+
+    ServerDetails.discover(URL, cache=cache, http=http)
+
+    assert cache.get(URL) is None
+
+
+def test_malformed_age_is_ignored():
+    from requests_oidc.utils.discovery import _freshness
+
+    assert _freshness({"Cache-Control": "max-age=60", "Age": "soon"}, 300) == 60
+    assert _freshness({"Age": "-"}, 300) == 300
@@ -0,0 +1,74 @@
+import webbrowser
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from requests_oidc import (
+    make_client_credentials_session,
+    make_device_code_session,
+    make_token_session,
+)
+from requests_oidc.plugins import PathPlugin
+from requests_oidc.testing import FakeIdP
+from requests_oidc.utils import DPoP
+
+
+def test_client_credentials_w_nonce():
+    with FakeIdP(dpop_nonce=True) as idp:
+        dpop = DPoP()
+        session = make_client_credentials_session(
+            idp.oidc_url, "client", "secret", dpop=dpop, discovery_cache=None
+        )
+
+        res = session.get(idp.api_url)
+        api_url = idp.api_url
+
+    assert res.status_code == 200
+    assert res.request.headers["Authorization"] == f"DPoP {session.access_token}"
+    assert session.token["token_type"] == "DPoP"
+    # Only the first request was retried, the API is on the same origin as the IdP
+    assert idp.hits["token"] == 2 and idp.hits["api"] == 1
+    token_proof, api_proof = idp.dpop_proofs
+    assert token_proof["htm"] == "POST" and "ath" not in token_proof
+    assert api_proof["htu"] == api_url and api_proof["nonce"] == idp.dpop_nonce
+
+
+def test_bound_refresh_token_needs_the_key(idp, tmp_path, monkeypatch):
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    plugin = PathPlugin(tmp_path / "token.json")
+    dpop = DPoP(PathPlugin(tmp_path / "dpop.json"))
+
+    session = make_device_code_session(
+        idp.oidc_url, "client", "api", plugin=plugin, dpop=dpop, discovery_cache=None
+    )
+    assert session.get(idp.api_url).status_code == 200
+
+    # A new process, w/ the key from the plugin
+    restarted = make_token_session(
+        idp.oidc_url,
+        "client",
+        plugin=plugin,
+        dpop=DPoP(PathPlugin(tmp_path / "dpop.json")),
+        discovery_cache=None,
+    )
+    restarted.refresh_token(restarted.auto_refresh_url)
+    assert restarted.get(idp.api_url).status_code == 200
+
+    stolen = make_token_session(
+        idp.oidc_url, "client", plugin=plugin, dpop=DPoP(), discovery_cache=None
+    )
+    with pytest.raises(Exception, match="invalid_grant"):
+        stolen.refresh_token(stolen.auto_refresh_url)
+
+
+def test_algorithm_is_negotiated(tmp_path):
+    dpop = DPoP()
+    dpop.bind(["RS256", "EdDSA"])
+    assert dpop.algorithm == "EdDSA"
+    assert dpop.jwk["kty"] == "OKP"
+
+    dpop.bind()
+    assert dpop.algorithm == "EdDSA"
+    with pytest.raises(ValueError):
+        DPoP(algorithm="ES256").bind(["RS256"])
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from requests_oidc import make_client_credentials_session
+from requests_oidc.exceptions import AuthFlowError
+from requests_oidc.exchange import TokenExchanger
+
+
+@pytest.fixture
+def exchanger(idp):
+    session = make_client_credentials_session(idp.oidc_url, "client", "secret", discovery_cache=None)
+    return TokenExchanger(session)
+
+
+def test_exchanged_tokens_are_cached_per_audience(idp, exchanger):
+    billing = exchanger.token("billing")
+    assert exchanger.token("billing") is billing
+    assert exchanger.token("billing", ["read"]) is not billing
+    assert exchanger.token("search") is not billing
+    assert idp.hits["token"] == 4
+
+    assert requests.get(idp.api_url, auth=exchanger.auth("billing")).status_code == 200
+    assert idp.hits["token"] == 4
+
+
+def test_scope_is_sent_as_given(exchanger):
+    token = exchanger.token("billing", ["write", "read"])
+
+    assert token["scope"] == "read write"
+    assert exchanger.token("billing", ["read", "write"]) is token
+
+
+def test_expiring_tokens_are_exchanged_again(idp, exchanger):
+    token = exchanger.token("billing")
+    token["expires_at"] = time.time() + 5
+
+    assert exchanger.token("billing")["access_token"] != token["access_token"]
+
+
+def test_concurrent_callers_share_an_exchange(idp, exchanger):
+    idp.latency = 0.05
+    threads = [threading.Thread(target=exchanger.token, args=("billing",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert idp.hits["token"] == 2
+
+
+def test_rejected_exchange(idp, exchanger):
+    exchanger.session.warm_up()
+    idp.revoke(exchanger.session.access_token)
+
+    with pytest.raises(AuthFlowError, match="invalid_grant"):
+        exchanger.token("billing")
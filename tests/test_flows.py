@@ -0,0 +1,162 @@
+import threading
+import time
+import webbrowser
+
+import pytest
+import requests
+
+from requests_oidc import (
+    make_auth_code_session,
+    make_client_credentials_session,
+    make_device_code_session,
+    make_token_session,
+)
+from requests_oidc.plugins import PathPlugin
+from requests_oidc.testing import FakeIdP
+
+
+def test_client_credentials(idp):
+    session = make_client_credentials_session(idp.oidc_url, "client", "secret", discovery_cache=None)
+    assert idp.hits["token"] == 0
+
+    assert session.get(idp.api_url).status_code == 200
+    assert idp.hits["token"] == 1
+
+
+def test_client_credentials_w_the_wrong_secret():
+    with FakeIdP(clients={"client": "secret"}) as idp:
+        session = make_client_credentials_session(
+            idp.oidc_url, "client", "wrong", discovery_cache=None
+        )
+
+        with pytest.raises(Exception, match="invalid_client"):
+            session.warm_up()
+
+
+def test_client_credentials_reuses_stored_token(idp, tmp_path):
+    plugin = PathPlugin(tmp_path / "token.json")
+    token = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", plugin=plugin, discovery_cache=None
+    ).warm_up()
+
+    session = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", plugin=plugin, discovery_cache=None
+    )
+    assert session.get(idp.api_url).status_code == 200
+    assert session.access_token == token["access_token"]
+    assert idp.hits["token"] == 1
+
+
+def test_device_code_then_token_session(idp, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    plugin = PathPlugin(tmp_path / "token.json")
+
+    session = make_device_code_session(idp.oidc_url, "client", "api", plugin=plugin, discovery_cache=None)
+    assert session.get(idp.api_url).status_code == 200
+    assert idp.hits["token"] == 2
+
+    reused = make_token_session(idp.oidc_url, "client", plugin=plugin, discovery_cache=None)
+    assert reused.access_token == session.access_token
+
+
+def _browse(url):
+    # Play the browser: follow the IdP's redirect back to the catcher, which only
+    # starts answering once the browser has been opened
+    threading.Thread(target=requests.get, args=(url,), daemon=True).start()
+    return True
+
+
+def test_auth_code(idp, unused_port, monkeypatch):
+    monkeypatch.setattr(webbrowser, "open", _browse)
+
+    session = make_auth_code_session(idp.oidc_url, "client", unused_port, discovery_cache=None)
+
+    assert session.get(idp.api_url).status_code == 200
+
+
+@pytest.fixture
+def validated(monkeypatch):
+    """Access tokens passed to ``TokenValidator.apply``."""
+    jwks = pytest.importorskip("requests_oidc.utils.jwks")
+    applied = []
+
+    def apply(self, token):
+        applied.append(token["access_token"])
+        return token
+
+    monkeypatch.setattr(jwks.TokenValidator, "apply", apply)
+    return applied
+
+
+def test_auth_code_validates_refreshed_tokens(idp, unused_port, monkeypatch, validated):
+    monkeypatch.setattr(webbrowser, "open", _browse)
+    session = make_auth_code_session(
+        idp.oidc_url, "client", unused_port, discovery_cache=None, validate=True
+    )
+
+    token = session.refresh_token(session.auto_refresh_url)
+
+    assert session.validator is not None
+    assert validated[-1] == token["access_token"]
+
+
+def test_token_session_validates_refreshed_tokens(idp, tmp_path, monkeypatch, validated):
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    plugin = PathPlugin(tmp_path / "token.json")
+    make_device_code_session(idp.oidc_url, "client", "api", plugin=plugin, discovery_cache=None)
+    session = make_token_session(
+        idp.oidc_url, "client", plugin=plugin, discovery_cache=None, validate=True
+    )
+
+    token = session.refresh_token(session.auto_refresh_url)
+
+    assert session.validator is not None
+    assert validated[-1] == token["access_token"]
+
+
+def test_expired_token_is_refreshed(idp):
+    session = make_client_credentials_session(idp.oidc_url, "client", "secret", discovery_cache=None)
+    session.token = dict(session.warm_up(), expires_at=time.time() - 1)
+
+    assert session.get(idp.api_url).status_code == 200
+    assert idp.hits["token"] == 2
+
+
+def test_plain_oauth2_session_klass(idp, tmp_path, monkeypatch):
+    from requests_oauthlib import OAuth2Session
+
+    session = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", klass=OAuth2Session, discovery_cache=None
+    )
+    assert type(session) is OAuth2Session
+    assert session.get(idp.api_url).status_code == 200
+    assert idp.hits["token"] == 1
+
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    plugin = PathPlugin(tmp_path / "token.json")
+    make_device_code_session(idp.oidc_url, "client", "api", plugin=plugin, discovery_cache=None)
+    session = make_token_session(
+        idp.oidc_url, "client", plugin=plugin, klass=OAuth2Session, discovery_cache=None
+    )
+    assert session.get(idp.api_url).status_code == 200
+
+    with pytest.raises(ValueError, match="validator"):
+        make_token_session(
+            idp.oidc_url,
+            "client",
+            plugin=plugin,
+            klass=OAuth2Session,
+            discovery_cache=None,
+            validate=True,
+        )
+
+
+def test_only_idp_traffic_shares_the_pool(idp):
+    http = requests.Session()
+    session = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", discovery_cache=None, http=http
+    )
+
+    assert session.get_adapter(f"{idp.url}/token") is http.get_adapter(f"{idp.url}/token")
+    api_url = "https://api.example/"
+    assert session.get_adapter(api_url) is not http.get_adapter(api_url)
@@ -1,5 +1,38 @@
+import json
+import subprocess
+import sys
+
 import requests_oidc
 
 
 def test_import():
     pass
+
+
+def _imported_by(statement):
+    out = subprocess.run(
+        [sys.executable, "-c", f"import sys, json; {statement}; print(json.dumps(list(sys.modules)))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return set(json.loads(out))
+
+
+def test_package_import_is_lazy():
+    modules = _imported_by("import requests_oidc")
+
+    assert not modules & {"requests", "oauthlib", "requests_oauthlib", "typer"}
+
+
+def test_token_flow_skips_interactive_dependencies():
+    modules = _imported_by("from requests_oidc import make_token_session")
+
+    assert "requests_oauthlib" in modules
+    assert not modules & {"qrcode", "webbrowser", "http.server", "typer"}
+
+
+def test_client_credentials_flow_skips_optional_dependencies():
+    modules = _imported_by("from requests_oidc import make_client_credentials_session")
+
+    assert not modules & {"jwt", "cryptography", "httpx"}
@@ -0,0 +1,113 @@
+import pytest
+
+from requests_oidc import make_client_credentials_session
+from requests_oidc.instrumentation import add_instrument, remove_instrument, span
+from requests_oidc.plugins import PathPlugin
+from requests_oidc.utils import DiscoveryCache
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+    def outcomes(self, name):
+        return [e.outcome for e in self.events if e.name == name]
+
+
+@pytest.fixture
+def recorder():
+    recorder = Recorder()
+    add_instrument(recorder)
+    yield recorder
+    remove_instrument(recorder)
+
+
+def test_session_lifecycle_is_reported(idp, recorder, tmp_path):
+    cache = DiscoveryCache()
+    plugin = PathPlugin(tmp_path / "token.json")
+    session = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", plugin=plugin, discovery_cache=cache
+    )
+    make_client_credentials_session(idp.oidc_url, "client", "secret", discovery_cache=cache)
+
+    session.warm_up()
+    idp.revoke(session.access_token)
+    session.get(idp.api_url)
+
+    assert recorder.outcomes("discovery") == ["fetched", "revalidated"]
+    assert recorder.outcomes("token.refresh") == ["ok"]
+    assert recorder.outcomes("plugin.load") == ["ok"]
+    assert recorder.outcomes("plugin.update") == ["ok"]
+    assert recorder.outcomes("unauthorized") == ["ok"]
+    assert all(e.duration is not None for e in recorder.events if e.name != "unauthorized")
+
+
+def test_failures_are_reported_by_exception(recorder):
+    with pytest.raises(KeyError):
+        with span("plugin.load"):
+            raise KeyError("token")
+
+    assert recorder.outcomes("plugin.load") == ["KeyError"]
+
+
+def test_broken_instrument_is_ignored(recorder):
+    class Broken:
+        def record(self, event):
+            raise RuntimeError("metrics backend down")
+
+    broken = Broken()
+    add_instrument(broken)
+    try:
+        with span("discovery"):
+            pass
+    finally:
+        remove_instrument(broken)
+
+    assert recorder.outcomes("discovery") == ["ok"]
+
+
+def test_prometheus():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    from requests_oidc.instrumentation import PrometheusInstrument
+
+    registry = prometheus_client.CollectorRegistry()
+    instrument = PrometheusInstrument(registry)
+    add_instrument(instrument)
+    try:
+        with span("token.refresh"):
+            pass
+    finally:
+        remove_instrument(instrument)
+
+    labels = {"event": "token.refresh", "outcome": "ok"}
+    assert registry.get_sample_value("requests_oidc_events_total", labels) == 1
+    assert registry.get_sample_value("requests_oidc_event_duration_seconds_count", labels) == 1
+
+
+def test_opentelemetry():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    from requests_oidc.instrumentation import OpenTelemetryInstrument
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    instrument = OpenTelemetryInstrument(provider.get_tracer("test"))
+    add_instrument(instrument)
+    try:
+        with pytest.raises(ValueError):
+            with span("token.fetch", url="https://idp.example/token"):
+                raise ValueError()
+    finally:
+        remove_instrument(instrument)
+
+    (finished,) = exporter.get_finished_spans()
+    assert finished.name == "requests_oidc.token.fetch"
+    assert finished.attributes["requests_oidc.outcome"] == "ValueError"
+    assert not finished.status.is_ok
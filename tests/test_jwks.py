@@ -0,0 +1,121 @@
+import json
+import time
+from datetime import timedelta
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from requests_oidc.exceptions import AuthFlowError
+from requests_oidc.utils import ClockSkew
+from requests_oidc.utils.jwks import JWKSCache, TokenValidator
+
+ISSUER = "https://idp.example"
+
+
+def _key(kid):
+    private = ec.generate_private_key(ec.SECP256R1())
+    jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private.public_key()))
+    jwk.update(kid=kid, alg="ES256", use="sig")
+    return private, jwk
+
+
+class FakeHTTP:
+    def __init__(self, *jwks):
+        self.jwks = list(jwks)
+        self.fetches = 0
+
+    def get(self, url):
+        self.fetches += 1
+        body = self.jwks[min(self.fetches, len(self.jwks)) - 1]
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return {"keys": body}
+
+        return Response()
+
+
+def _sign(private, kid, **claims):
+    return jwt.encode(claims, private, algorithm="ES256", headers={"kid": kid})
+
+
+def test_claims_replace_reported_expiry_and_scope():
+    private, jwk = _key("k1")
+    validator = TokenValidator(JWKSCache("https://idp.example/jwks", FakeHTTP([jwk])), ISSUER, "client")
+    exp = int(time.time()) + 60
+    token = {
+        "access_token": _sign(private, "k1", exp=exp, scope="openid read"),
+        "id_token": _sign(private, "k1", iss=ISSUER, aud="client", exp=exp),
+        "expires_at": time.time() + 3600,
+        "scope": ["openid"],
+    }
+
+    validator.apply(token)
+
+    assert token["expires_at"] == exp
+    assert token["scope"] == ["openid", "read"]
+
+
+def test_unknown_kid_refetches_keys_once():
+    old, old_jwk = _key("old")
+    new, new_jwk = _key("new")
+    http = FakeHTTP([old_jwk], [old_jwk, new_jwk])
+    validator = TokenValidator(JWKSCache("https://idp.example/jwks", http, min_refetch_interval=0))
+
+    validator.claims(_sign(old, "old", sub="a"))
+    validator.claims(_sign(new, "new", sub="b"))
+    token = _sign(new, "new", sub="c")
+    validator.claims(token)
+    validator.claims(token)
+
+    assert http.fetches == 2
+
+
+def test_bad_signature_is_rejected():
+    _, jwk = _key("k1")
+    forger, _ = _key("k1")
+    validator = TokenValidator(JWKSCache("https://idp.example/jwks", FakeHTTP([jwk])))
+
+    with pytest.raises(AuthFlowError):
+        validator.claims(_sign(forger, "k1", sub="a"))
+
+
+def test_algorithm_comes_from_the_key():
+    private, jwk = _key("k1")
+    validator = TokenValidator(
+        JWKSCache("https://idp.example/jwks", FakeHTTP([jwk])), id_token_algs=["RS256"]
+    )
+    # The header can't pick the algorithm the key is used w/
+    other = ec.generate_private_key(ec.SECP384R1())
+    with pytest.raises(AuthFlowError):
+        validator.claims(jwt.encode({"sub": "a"}, other, algorithm="ES384", headers={"kid": "k1"}))
+
+    # Nor can the key be used for id_tokens w/ an algorithm the IdP doesn't advertise
+    with pytest.raises(AuthFlowError):
+        validator.apply({"access_token": "opaque", "id_token": _sign(private, "k1", sub="a")})
+
+
+def test_skewed_idp_clock():
+    private, jwk = _key("k1")
+    idp_now = time.time() + 300
+    clock_skew = ClockSkew()
+    clock_skew.observe(
+        SimpleNamespace(headers={"Date": formatdate(idp_now, usegmt=True)}, elapsed=timedelta())
+    )
+    validator = TokenValidator(
+        JWKSCache("https://idp.example/jwks", FakeHTTP([jwk])), clock_skew=clock_skew
+    )
+    # Issued "in the future", as far as our clock can tell
+    token = {"access_token": _sign(private, "k1", iat=int(idp_now), exp=int(idp_now) + 60)}
+
+    validator.apply(token)
+
+    assert clock_skew.offset == pytest.approx(300, abs=1.5)
+    assert token["expires_at"] - time.time() == pytest.approx(60, abs=1.5)
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from requests_oidc.manager import TokenManager
+from requests_oidc.utils import DiscoveryCache
+
+
+def _manager(**kwargs):
+    return TokenManager(discovery_cache=DiscoveryCache(), **kwargs)
+
+
+def _token(manager, idp, client_id="client"):
+    return manager.token(idp.oidc_url, client_id, "secret")
+
+
+def test_sessions_are_reused_per_key(idp):
+    manager = _manager()
+
+    a = manager.session(idp.oidc_url, "client", "secret", audience="api")
+    assert manager.session(idp.oidc_url, "client", "secret", audience="api") is a
+    assert manager.session(idp.oidc_url, "client", "secret", audience="other") is not a
+    assert idp.hits["token"] == 0
+
+
+def test_concurrent_first_calls_fetch_once(idp):
+    manager = _manager()
+    idp.latency = 0.05
+
+    threads = [
+        threading.Thread(target=manager.token, args=(idp.oidc_url, "client", "secret"))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert idp.hits["token"] == 1
+
+
+def test_least_recently_used_are_evicted(idp):
+    manager = _manager(maxsize=2)
+
+    a = manager.session(idp.oidc_url, "a", "secret")
+    manager.session(idp.oidc_url, "b", "secret")
+    manager.session(idp.oidc_url, "a", "secret")
+    manager.session(idp.oidc_url, "c", "secret")
+
+    assert len(manager) == 2
+    assert manager.session(idp.oidc_url, "a", "secret") is a
+    assert TokenManager.key(idp.oidc_url, "b", client_secret="secret") not in manager._entries
+
+
+def test_idle_sessions_expire(idp):
+    manager = _manager(ttl=0)
+
+    a = manager.session(idp.oidc_url, "client", "secret")
+    assert manager.session(idp.oidc_url, "client", "secret") is not a
+
+
+def test_expiring_tokens_are_refreshed(idp):
+    manager = _manager()
+
+    token = _token(manager, idp)
+    assert _token(manager, idp) is token
+
+    session = manager.session(idp.oidc_url, "client", "secret")
+    session.token = dict(token, expires_at=time.time() + 5)
+    assert _token(manager, idp)["access_token"] != token["access_token"]
+    assert idp.hits["token"] == 2
+
+
+def test_new_credentials_get_a_new_session(idp):
+    manager = _manager()
+
+    a = manager.session(idp.oidc_url, "client", "secret")
+    assert manager.session(idp.oidc_url, "client", "rotated") is not a
+    assert manager.session(idp.oidc_url, "client", "secret") is a
+
+    manager.evict(idp.oidc_url, "client")
+    assert len(manager) == 0
@@ -0,0 +1,152 @@
+import multiprocessing
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from requests_oidc.plugins import (
+    LockingPathPlugin,
+    PathPlugin,
+    SharedMemoryPlugin,
+    SQLiteTokenStore,
+    WriteBehindPlugin,
+)
+
+
+def _token(access_token):
+    return {"access_token": access_token, "expires_at": time.time() + 300}
+
+
+def test_path_plugin_round_trip(tmp_path):
+    plugin = PathPlugin(tmp_path / "token.json")
+    plugin.update(_token("a"))
+
+    assert plugin.load()["access_token"] == "a"
+    assert [p.name for p in tmp_path.iterdir()] == ["token.json"]
+
+
+def test_locking_plugin_follows_other_writers(tmp_path):
+    leader = LockingPathPlugin(tmp_path / "token.json")
+    follower = LockingPathPlugin(tmp_path / "token.json")
+    leader.update(_token("a"))
+
+    first = follower.load()
+    assert follower.load() is first
+
+    leader.update(_token("b"))
+    assert follower.load()["access_token"] == "b"
+
+
+def test_locking_plugin_refreshes_once(tmp_path):
+    leader = LockingPathPlugin(tmp_path / "token.json")
+    follower = LockingPathPlugin(tmp_path / "token.json")
+    stale = _token("a")
+    leader.update(stale)
+    fetches = []
+
+    def fetch():
+        fetches.append(None)
+        return _token(f"fresh-{len(fetches)}")
+
+    assert leader.refresh(stale, fetch)["access_token"] == "fresh-1"
+    assert follower.refresh(stale, fetch)["access_token"] == "fresh-1"
+    assert len(fetches) == 1
+
+
+def test_sqlite_store_rows_are_keyed_by_credential(tmp_path):
+    store = SQLiteTokenStore(tmp_path / "tokens.db")
+    read_write = store.plugin("https://idp", "client", "api", ["write", "read"])
+    read_only = store.plugin("https://idp", "client", "api", ["read"])
+
+    read_write.update(_token("rw"))
+    read_only.update(_token("r"))
+
+    assert store.plugin("https://idp", "client", "api", ["read", "write"]).load()["access_token"] == "rw"
+    assert read_only.load()["access_token"] == "r"
+    assert store.plugin("https://idp", "other").load() is None
+
+
+def test_sqlite_store_purges_dead_rows(tmp_path):
+    store = SQLiteTokenStore(tmp_path / "tokens.db")
+    dead = {"access_token": "a", "expires_at": time.time() - 10}
+    store.plugin("https://idp", "dead").update(dead)
+    store.plugin("https://idp", "alive").update(_token("b"))
+
+    assert [key[1] for key in store.expiring()] == ["dead"]
+    assert store.purge() == 1
+    assert store.plugin("https://idp", "alive").load() is not None
+
+
+def _refresh_in_child(plugin):
+    plugin.refresh({"access_token": "a"}, lambda: _token("from-child"))
+    # A worker shutting down mustn't destroy the segment under the others
+    plugin.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs fork")
+def test_shared_memory_plugin_sees_other_workers_refresh():
+    plugin = SharedMemoryPlugin()
+    try:
+        plugin.update(_token("a"))
+        first = plugin.load()
+        assert plugin.load() is first
+
+        child = multiprocessing.get_context("fork").Process(target=_refresh_in_child, args=(plugin,))
+        child.start()
+        child.join()
+
+        assert plugin.load()["access_token"] == "from-child"
+        attached = SharedMemoryPlugin(plugin.name, create=False)
+        assert attached.load()["access_token"] == "from-child"
+        attached.close()
+    finally:
+        plugin.close()
+
+
+class SlowPlugin:
+    def __init__(self):
+        self.stored = []
+        self.writing = threading.Event()
+
+    def load(self):
+        return self.stored[-1] if self.stored else None
+
+    def update(self, token):
+        self.writing.set()
+        time.sleep(0.2)
+        self.stored.append(token)
+
+
+def test_write_behind_coalesces_updates():
+    slow = SlowPlugin()
+    plugin = WriteBehindPlugin(slow)
+
+    start = time.monotonic()
+    plugin.update(_token("a"))
+    slow.writing.wait()
+    for access_token in "bcd":
+        plugin.update(_token(access_token))
+    assert time.monotonic() - start < 0.2
+    assert plugin.load()["access_token"] == "d"
+
+    assert plugin.flush()
+    assert [t["access_token"] for t in slow.stored] == ["a", "d"]
+    assert plugin.coalesced == 2
+    plugin.close()
+
+
+def test_write_behind_flushes_at_exit(tmp_path):
+    path = tmp_path / "token.json"
+    script = f"""
+        from pathlib import Path
+        from requests_oidc.plugins import PathPlugin, WriteBehindPlugin
+
+        plugin = WriteBehindPlugin(PathPlugin(Path({str(path)!r})), delay=60)
+        plugin.update({{"access_token": "a"}})
+    """
+    subprocess.run([sys.executable, "-c", textwrap.dedent(script)], check=True)
+
+    assert PathPlugin(path).load() == {"access_token": "a"}
@@ -0,0 +1,56 @@
+import functools
+import threading
+import time
+
+from requests_oidc import make_client_credentials_session
+from requests_oidc.pool import SessionPool
+
+
+def _pool(idp, workers=16):
+    factory = functools.partial(
+        make_client_credentials_session, idp.oidc_url, "client", "secret", discovery_cache=None
+    )
+    return SessionPool(factory, workers=workers)
+
+
+def _run(pool, url, threads):
+    # The sessions themselves, not their ids, those get reused once a thread's is freed
+    sessions, statuses = [], []
+
+    def work():
+        session = pool.session()
+        sessions.append(session)
+        for _ in range(3):
+            statuses.append(session.get(url).status_code)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sessions, statuses
+
+
+def test_threads_share_one_token(idp):
+    pool = _pool(idp)
+
+    sessions, statuses = _run(pool, idp.api_url, 16)
+
+    assert statuses == [200] * 48
+    assert len({id(session) for session in sessions}) == 16
+    assert idp.hits["token"] == 1
+    assert pool.session() is pool.session()
+    assert pool.http.adapters["http://"]._pool_maxsize == 16
+
+
+def test_expired_token_is_refreshed_once(idp):
+    pool = _pool(idp)
+    pool.request("GET", idp.api_url).raise_for_status()
+    first = pool.snapshot()
+
+    pool.source.token = dict(pool.source.token, expires_at=time.time() - 1)
+    _, statuses = _run(pool, idp.api_url, 16)
+
+    assert statuses == [200] * 48
+    assert idp.hits["token"] == 2
+    assert pool.snapshot().access_token != first.access_token
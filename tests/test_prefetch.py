@@ -0,0 +1,63 @@
+import time
+
+from requests_oidc.prefetch import prefetch
+from requests_oidc.testing import FakeIdP
+from requests_oidc.utils import DiscoveryCache
+
+
+def _spec(idp, client_id):
+    return {
+        "flow": "client_credentials",
+        "oidc_url": idp.oidc_url,
+        "client_id": client_id,
+        "client_secret": "secret",
+    }
+
+
+def test_sessions_are_ready_and_discovery_is_shared(idp):
+    result = prefetch(
+        [_spec(idp, f"client-{i}") for i in range(6)], discovery_cache=DiscoveryCache()
+    )
+
+    assert result.ok
+    assert all(session.access_token for session in result.sessions)
+    assert idp.hits[".well-known/openid-configuration"] == 1
+    assert idp.hits["token"] == 6
+
+
+def test_fetches_run_concurrently():
+    with FakeIdP(latency=0.2) as idp:
+        start = time.monotonic()
+        result = prefetch([_spec(idp, f"client-{i}") for i in range(8)], discovery_cache=None)
+        elapsed = time.monotonic() - start
+
+    assert result.ok
+    # Serially, that'd be 8 token requests + discovery at 0.2s each
+    assert elapsed < 1
+
+
+def test_failures_are_reported_per_spec(idp):
+    specs = [
+        _spec(idp, "good"),
+        dict(_spec(idp, "bad"), oidc_url=f"{idp.url}/missing"),
+    ]
+
+    result = prefetch(specs, discovery_cache=None)
+
+    assert result.sessions[0].access_token
+    assert result.sessions[1] is None
+    assert list(result.errors) == [1]
+
+
+def test_malformed_specs_are_reported_per_spec(idp):
+    specs = [
+        {"flow": "client_credentials", "client_id": "no-url", "client_secret": "secret"},
+        _spec(idp, "good"),
+        dict(_spec(idp, "bad"), flow="implicit"),
+    ]
+
+    result = prefetch(specs, discovery_cache=None)
+
+    assert result.sessions[1].access_token
+    assert sorted(result.errors) == [0, 2]
+    assert all(isinstance(e, ValueError) for e in result.errors.values())
@@ -0,0 +1,77 @@
+import time
+import webbrowser
+
+import pytest
+import requests
+
+from requests_oidc import make_client_credentials_session, make_device_code_session
+from requests_oidc.exceptions import CircuitOpenError
+from requests_oidc.utils import Backoff, CircuitBreaker, Resilience
+
+
+def _session(idp, **kwargs):
+    kwargs.setdefault("backoff", Backoff(base=0.01))
+    kwargs.setdefault("breaker", CircuitBreaker())
+    return make_client_credentials_session(
+        idp.oidc_url,
+        "client",
+        "secret",
+        discovery_cache=None,
+        resilience=Resilience(**kwargs),
+    )
+
+
+def test_transient_failures_are_retried(idp):
+    idp.fail_next(2, 503)
+
+    assert _session(idp).warm_up()["access_token"]
+    assert idp.hits["token"] == 3
+
+
+def test_refusals_are_not_retried(idp):
+    idp.fail_next(1, 400)
+
+    with pytest.raises(Exception):
+        _session(idp).warm_up()
+    assert idp.hits["token"] == 1
+
+
+def test_breaker_opens_after_repeated_failures(idp):
+    breaker = CircuitBreaker(threshold=2, reset_after=60)
+    session = _session(idp, backoff=Backoff(attempts=1), breaker=breaker)
+    idp.fail_next(10, 503)
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            session.warm_up()
+    with pytest.raises(CircuitOpenError):
+        session.warm_up()
+
+    assert breaker.open
+    assert idp.hits["token"] == 2
+
+
+def test_stale_token_is_served_while_refresh_fails(idp):
+    session = _session(idp, backoff=Backoff(attempts=1), serve_stale=60)
+    token = session.warm_up()
+    session.token = dict(token, expires_at=time.time() + 30)
+    idp.fail_next(1, 503)
+
+    assert session.get(idp.api_url).status_code == 200
+    session._background.join()
+    assert session.access_token == token["access_token"]
+
+    session.get(idp.api_url)
+    session._background.join()
+    assert session.access_token != token["access_token"]
+
+
+def test_device_code_polls_through_an_outage(idp, monkeypatch, capsys):
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    idp.device_approve_after = 0
+    idp.fail_next(2, 503)
+
+    session = make_device_code_session(idp.oidc_url, "client", "api", discovery_cache=None)
+
+    assert session.access_token
+    assert idp.hits["token"] == 3
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from requests_oidc.scheduler import RefreshScheduler
+
+
+class StubSession:
+    auto_refresh_url = "https://idp.example/token"
+
+    def __init__(self, expires_in: float) -> None:
+        self.expires_in = expires_in
+        self.token = {"expires_at": time.time() + expires_in}
+        self.refreshed = threading.Event()
+        self.updates = []
+
+    def refresh_token(self, url):
+        self.token = {"expires_at": time.time() + 3600} if self.expires_in else {}
+        return self.token
+
+    def token_updater(self, token):
+        self.updates.append(token)
+        self.refreshed.set()
+
+
+def test_refreshes_each_session_before_expiry():
+    soon, later = StubSession(0.1), StubSession(0.3)
+
+    with RefreshScheduler(margin=0, jitter=0) as scheduler:
+        scheduler.register(soon)
+        scheduler.register(later)
+        assert soon.refreshed.wait(2)
+        assert later.refreshed.wait(2)
+
+    assert len(soon.updates) == len(later.updates) == 1
+
+
+def test_unregistered_sessions_are_left_alone():
+    session = StubSession(0.1)
+
+    with RefreshScheduler(margin=0, jitter=0) as scheduler:
+        scheduler.register(session)
+        scheduler.unregister(session)
+        assert not session.refreshed.wait(0.3)
+
+
+def test_tokens_that_dont_expire_are_left_alone():
+    session = StubSession(0)
+    session.token = {}
+
+    with RefreshScheduler(margin=0, jitter=0) as scheduler:
+        scheduler.register(session)
+        assert not session.refreshed.wait(0.3)
+
+    # And once a refresh hands one back, the session is dropped
+    session = StubSession(0.1)
+    session.expires_in = 0
+    with RefreshScheduler(margin=0, jitter=0, retry=0) as scheduler:
+        scheduler.register(session)
+        assert session.refreshed.wait(2)
+        time.sleep(0.3)
+
+    assert len(session.updates) == 1
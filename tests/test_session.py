@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+from requests_oidc import make_client_credentials_session
+from requests_oidc.session import OIDCSession
+from requests_oidc.utils import SingleFlight
+
+TOKEN_URL = "https://idp.example/token"
+
+
+class FakeIdP(BaseAdapter):
+    """Answers token requests w/ a fresh token, and anything else w/ 200."""
+
+    def __init__(self, delay: float = 0.05) -> None:
+        super().__init__()
+        self.delay = delay
+        self.refreshes = 0
+
+    def send(self, request, **kwargs):
+        res = requests.Response()
+        res.request = request
+        res.url = request.url
+        res.status_code = 200
+        if request.url == TOKEN_URL:
+            time.sleep(self.delay)
+            self.refreshes += 1
+            body = {
+                "access_token": f"access-{self.refreshes}",
+                "refresh_token": f"refresh-{self.refreshes}",
+                "token_type": "Bearer",
+                "expires_in": 300,
+            }
+            res._content = json.dumps(body).encode()
+        else:
+            res._content = b"{}"
+        return res
+
+    def close(self):
+        pass
+
+
+def _expired_session(updates):
+    session = OIDCSession(
+        client_id="client",
+        auto_refresh_url=TOKEN_URL,
+        token={
+            "access_token": "access-0",
+            "refresh_token": "refresh-0",
+            "token_type": "Bearer",
+            "expires_at": time.time() - 10,
+        },
+        token_updater=updates.append,
+    )
+    idp = FakeIdP()
+    session.mount("https://", idp)
+    return session, idp
+
+
+def test_concurrent_refreshes_are_coalesced():
+    updates = []
+    session, idp = _expired_session(updates)
+
+    threads = [
+        threading.Thread(target=session.get, args=("https://api.example/",))
+        for _ in range(16)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert idp.refreshes == 1
+    assert len(updates) == 1
+    # Threads slow to start find the refresh done, and lead a call that skips it
+    coordinator = session.refresh_coordinator
+    assert coordinator.calls + coordinator.coalesced == 16
+    assert session.access_token == "access-1"
+
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+
+    def boom():
+        raise ValueError("nope")
+
+    for _ in range(2):
+        try:
+            flight.run(boom)
+        except ValueError:
+            pass
+
+    assert flight.calls == 2
+    assert flight.coalesced == 0
+
+
+def test_fast_mode_renews_at_the_deadline():
+    updates = []
+    session = OIDCSession(
+        client_id="client",
+        auto_refresh_url=TOKEN_URL,
+        token={
+            "access_token": "access-0",
+            "refresh_token": "refresh-0",
+            "token_type": "Bearer",
+            "expires_at": time.time() + 300,
+        },
+        token_updater=updates.append,
+        fast=True,
+    )
+    idp = FakeIdP(delay=0)
+    session.mount("https://", idp)
+
+    res = session.get("https://api.example/", headers={"Accept": "application/json"})
+    assert res.request.headers["Authorization"] == "Bearer access-0"
+    assert res.request.headers["Accept"] == "application/json"
+
+    # Past the deadline, whatever the wall clock says
+    session.token = dict(session.token, expires_at=time.time() - 1)
+    res = session.get("https://api.example/")
+    assert res.request.headers["Authorization"] == "Bearer access-1"
+    assert [t["access_token"] for t in updates] == ["access-1"]
+    assert not session._snapshot.expired
+
+
+def test_unauthorized_requests_are_replayed_after_one_refresh(idp):
+    session = make_client_credentials_session(
+        idp.oidc_url, "client", "secret", retry_unauthorized=True, discovery_cache=None
+    )
+    session.get(idp.api_url).raise_for_status()
+    idp.revoke(session.access_token)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(session.get(idp.api_url).status_code))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [200] * 8
+    assert idp.hits["token"] == 2